@@ -1,31 +1,90 @@
 import functools
+import itertools
 import logging
+from typing import Union
 
 import click
 import rich.logging
-import rich.table
 
 import authum
 import authum.plugin
 import authum.util
 
 
-authum.plugin.load_plugins()
-plugin_list = "\n".join(
-    f"- {p.__name__.split('.')[-1]} ({p.__name__})"
-    for p in authum.plugin.manager.get_plugins()
-)
+class Plugins:
+    """Loads plugins on first use"""
+
+    def __init__(self) -> None:
+        self.modules: Union[list, None] = None
+
+    def load(self) -> list:
+        """Imports and registers plugin modules (once)"""
+        if self.modules is None:
+            self.modules = authum.plugin.load_plugins()
+        return self.modules
+
+    @functools.cached_property
+    def plugin_list(self) -> str:
+        """Returns a human-readable list of plugins"""
+        self.load()
+        return "\n".join(
+            f"- {p.__name__.split('.')[-1]} ({p.__name__})"
+            for p in authum.plugin.manager.get_plugins()
+        )
+
+
+plugins = Plugins()
+
+
+class PluginGroup(click.Group):
+    """Click group that defers plugin CLI extensions until a command lookup
+    can't be satisfied by the built-in commands"""
+
+    _cli_extended = False
+
+    def extend_cli(self) -> None:
+        """Loads plugins and lets them add CLI commands"""
+        if self._cli_extended:
+            return
+        self._cli_extended = True
+        plugins.load()
+        authum.plugin.manager.hook.extend_cli(click_group=self)  # type: ignore
 
+    def get_command(self, ctx: click.Context, cmd_name: str):
+        command = super().get_command(ctx, cmd_name)
+        if command is None and not self._cli_extended:
+            self.extend_cli()
+            command = super().get_command(ctx, cmd_name)
+        return command
 
-@click.group()
+    def list_commands(self, ctx: click.Context) -> list:
+        self.extend_cli()
+        return super().list_commands(ctx)
+
+
+def print_version(ctx: click.Context, param: click.Parameter, value: bool) -> None:
+    if not value or ctx.resilient_parsing:
+        return
+    click.echo(
+        f"{authum.metadata['Name']} {authum.metadata['Version']}\n\n"
+        f"Plugins:\n{plugins.plugin_list}"
+    )
+    ctx.exit()
+
+
+@click.group(cls=PluginGroup)
 @click.option(
     "--debug",
     is_flag=True,
     help="Enable debug mode (WARNING: logs may include sensitive data)",
 )
-@click.version_option(
-    prog_name=authum.metadata["Name"],
-    message=f"%(prog)s %(version)s\n\nPlugins:\n{plugin_list}",
+@click.option(
+    "--version",
+    is_flag=True,
+    expose_value=False,
+    is_eager=True,
+    callback=print_version,
+    help="Show the version and exit.",
 )
 def main(debug: bool) -> None:
     handler_opts = {
@@ -47,19 +106,12 @@ def main(debug: bool) -> None:
 @main.command()
 def apps() -> None:
     """List apps from all configured identity providers"""
-    apps = functools.reduce(list.__add__, authum.plugin.manager.hook.list_apps())  # type: ignore
+    plugins.load()
+    apps = list(itertools.chain.from_iterable(authum.plugin.manager.hook.list_apps()))  # type: ignore
     if not apps:
         authum.util.rich_stderr.print(
             "No apps found. Do you have at least one identity provider configured?"
         )
         return
 
-    table = rich.table.Table(**authum.util.rich_table_horizontal_opts)
-    table.add_column("Name")
-    table.add_column("URL")
-    for a in sorted(apps):
-        table.add_row(a.name, a.url)
-    authum.util.rich_stderr.print(table)
-
-
-authum.plugin.manager.hook.extend_cli(click_group=main)  # type: ignore
+    authum.util.print_rows(("Name", "URL"), [(a.name, a.url) for a in sorted(apps)])
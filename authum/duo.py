@@ -1,19 +1,15 @@
-import contextlib
 import logging
-import socket
 import threading
-import time
 from typing import Union
 import webbrowser
 
 import flask
-import flask.cli
+import werkzeug.serving
 
 import authum
 import authum.http
 
 
-flask.cli.show_server_banner = lambda *args: None
 logging.getLogger("werkzeug").disabled = True
 log = logging.getLogger(__name__)
 
@@ -37,13 +33,11 @@ class DuoWebV2:
         post_argument: str = "sig_response",
         duo_form_args: dict = {},
         script_url: str = "https://api.duosecurity.com/frame/hosted/Duo-Web-v2.min.js",
-        poll_interval: float = 0.25,
     ) -> None:
         self._app = flask.Flask(__name__)
         self._post_action_proxy = post_action_proxy
         self._post_action_event = threading.Event()
         self._post_action_response = authum.http.RESTResponse()
-        self._poll_interval = poll_interval
 
         @self._app.route("/")
         def index():
@@ -86,34 +80,19 @@ class DuoWebV2:
             return ""
 
     def start_server(self) -> None:
-        """Starts the local web server"""
+        """Starts the local web server. The listening socket is bound before
+        this returns, so the server is ready to accept connections."""
         self._server_host = "127.0.0.1"
-        with contextlib.closing(
-            socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        ) as sock:
-            sock.bind((self._server_host, 0))
-            self._server_port = sock.getsockname()[1]
+        server = werkzeug.serving.make_server(
+            self._server_host, 0, self._app, threaded=True
+        )
+        self._server_port = server.server_port
 
         log.debug(f"Starting web server: {self._server_host}:{self._server_port}")
-        thread = threading.Thread(
-            target=lambda: self._app.run(
-                host=self._server_host,
-                port=self._server_port,
-                debug=True,
-                use_reloader=False,
-            )
-        )
+        thread = threading.Thread(target=server.serve_forever)
         thread.daemon = True
         thread.start()
 
-        while True:
-            with contextlib.closing(
-                socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            ) as sock:
-                if sock.connect_ex((self._server_host, self._server_port)) == 0:
-                    break
-            time.sleep(self._poll_interval)
-
     def prompt(self) -> authum.http.RESTResponse:
         """Opens a web browser and displays the Duo prompt"""
         self.start_server()
@@ -123,7 +102,6 @@ class DuoWebV2:
 
         if self._post_action_proxy:
             log.debug("Waiting for post_action event...")
-            while not self._post_action_event.is_set():
-                time.sleep(self._poll_interval)
+            self._post_action_event.wait()
 
         return self._post_action_response
@@ -1,13 +1,17 @@
 import base64
 from collections.abc import Mapping
 import dataclasses
+import functools
+import html
 import json
 import logging
-from typing import Any, Iterable
+import re
+from typing import Any, Iterable, Union
 import xml.etree.ElementTree
 
 import bs4
 import requests
+import requests.adapters
 
 
 log = logging.getLogger(__name__)
@@ -21,10 +25,15 @@ class RESTResponse(Mapping):
 
         self._response = response
 
-        try:
-            self._data = response.json()
-        except json.decoder.JSONDecodeError:
-            self._data = {}
+        # Decode the raw bytes directly; response.json() would decode them to
+        # text first, which may involve character set detection.
+        self._data = {}
+        content_type = response.headers.get("Content-Type", "")
+        if response.content and not content_type.startswith("text/html"):
+            try:
+                self._data = json.loads(response.content)
+            except ValueError:
+                pass
 
     @property
     def response(self):
@@ -36,10 +45,10 @@ class RESTResponse(Mapping):
         return self._data[k]
 
     def __iter__(self) -> Iterable:
-        return (k for k in self._data)
+        return iter(self._data)
 
     def __len__(self) -> int:
-        return len(list(self.__iter__()))
+        return len(self._data)
 
     def __str__(self) -> str:
         return self._response.content.decode()
@@ -49,18 +58,18 @@ class SAMLAssertion:
     """Represents a SAML assertion"""
 
     def __init__(self, saml_assertion: str) -> None:
-        try:
-            self._xml = base64.b64decode(saml_assertion).decode()
+        if saml_assertion.lstrip().startswith("<"):
+            self._raw = bytes(saml_assertion, "utf-8")
+            self._b64encoded = base64.b64encode(self._raw).decode()
+        else:
+            self._raw = base64.b64decode(saml_assertion)
             self._b64encoded = saml_assertion
-        except UnicodeDecodeError:
-            self._xml = saml_assertion
-            self._b64encoded = base64.b64encode(bytes(saml_assertion, "utf-8")).decode()
 
-        self._attrs = SAMLAssertionAttributes(self._xml)
+        self._attrs = SAMLAssertionAttributes(self._raw)
 
-    @property
+    @functools.cached_property
     def xml(self) -> str:
-        return self._xml
+        return self._raw.decode()
 
     @property
     def b64encoded(self) -> str:
@@ -71,7 +80,7 @@ class SAMLAssertion:
         return self._attrs
 
     def __str__(self) -> str:
-        return self._xml
+        return self.xml
 
     def __eq__(self, other) -> bool:
         return str(self) == str(other)
@@ -80,7 +89,7 @@ class SAMLAssertion:
 class SAMLAssertionAttributes(Mapping):
     """Provides a simple dict-like interface for SAML assertion attributes"""
 
-    def __init__(self, saml_assertion: str) -> None:
+    def __init__(self, saml_assertion: Union[str, bytes]) -> None:
         self.ns = {
             "samlp": "urn:oasis:names:tc:SAML:2.0:protocol",
             "saml": "urn:oasis:names:tc:SAML:2.0:assertion",
@@ -88,110 +97,123 @@ class SAMLAssertionAttributes(Mapping):
         root = xml.etree.ElementTree.fromstring(saml_assertion)
         self.attribute_statement = root.find(".//saml:AttributeStatement", self.ns)
 
+        self._index = {}
+        if self.attribute_statement is not None:
+            for attr in self.attribute_statement.findall(".//saml:Attribute", self.ns):
+                self._index.setdefault(
+                    attr.attrib["Name"],
+                    [v.text for v in attr.findall(".//saml:AttributeValue", self.ns)],
+                )
+
     def __getitem__(self, k: str) -> list:
-        if not self.attribute_statement:
-            return []
+        return self._index[k]
 
-        attr = self.attribute_statement.find(f".//saml:Attribute[@Name='{k}']", self.ns)
-        if not attr:
-            raise KeyError(k)
-        return [v.text for v in attr.findall(".//saml:AttributeValue", self.ns)]
+    def get(self, k: str, default: Any = None) -> Any:
+        return self._index.get(k, default)
 
     def __iter__(self) -> Iterable:
-        if not self.attribute_statement:
-            return []
-
-        return (
-            k.attrib["Name"]
-            for k in self.attribute_statement.findall(".//saml:Attribute", self.ns)
-        )
+        return iter(self._index)
 
     def __len__(self) -> int:
-        return len(list(self.__iter__()))
+        return len(self._index)
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True)
 class SSOApplication:
     """Represents an SSO application"""
 
     name: str
     url: str
+    _sort_key: str = dataclasses.field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "_sort_key", self.name.casefold())
 
     def __lt__(self, other):
-        return self.name.casefold() < other.name.casefold()
+        return self._sort_key < other._sort_key
 
 
 class HTTPClient:
-    """Simple HTTP client"""
+    """Simple HTTP client. Clients keep their own cookies, but share a
+    connection pool so that connections (and TLS sessions) are reused across
+    client instances."""
+
+    HTML_HEADERS = {"Accept": "text/html", "Content-Type": "text/html"}
+    REST_HEADERS = {"Accept": "application/json", "Content-Type": "application/json"}
+
+    _adapter = requests.adapters.HTTPAdapter(pool_connections=10, pool_maxsize=10)
 
     def __init__(self) -> None:
         self._client = requests.Session()
-
-    def http_request(self, **kwargs) -> requests.Response:
-        """Performs an HTTP request and returns the response"""
-        if "method" not in kwargs:
-            kwargs["method"] = "get"
-
-        kwargs["headers"] = {
-            **{
-                "Accept": "text/html",
-                "Content-Type": "text/html",
-            },
-            **kwargs.get("headers", {}),
-        }
+        for prefix in ("https://", "http://"):
+            self._client.mount(prefix, self._adapter)
+
+    def _request(self, kind: str, default_headers: dict, **kwargs) -> requests.Response:
+        """Performs a request with default headers (which may be overridden by
+        the caller) and logs the response"""
+        headers = kwargs.get("headers")
+        kwargs["headers"] = (
+            {**default_headers, **headers} if headers else default_headers
+        )
 
         response = self._client.request(**kwargs)
-        log.debug(
-            f"HTTP response ({response.status_code}): {response.content.decode()}"
-        )
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(
+                f"{kind} response ({response.status_code}): {response.content.decode()}"
+            )
 
         return response
 
+    def http_request(self, **kwargs) -> requests.Response:
+        """Performs an HTTP request and returns the response"""
+        kwargs.setdefault("method", "get")
+        return self._request("HTTP", self.HTML_HEADERS, **kwargs)
+
     def rest_request(self, **kwargs) -> RESTResponse:
         """Performs an API request and returns the response"""
-        kwargs["headers"] = {
-            **{
-                "Accept": "application/json",
-                "Content-Type": "application/json",
-            },
-            **kwargs.get("headers", {}),
-        }
-
-        response = self._client.request(**kwargs)
-        log.debug(
-            f"REST response ({response.status_code}): {response.content.decode()}"
-        )
-
-        return RESTResponse(response)
+        if kwargs.get("json") is not None:
+            # Serialize without the padding requests' json= would add
+            kwargs["data"] = json.dumps(
+                kwargs.pop("json"), separators=(",", ":"), allow_nan=False
+            ).encode()
+        return RESTResponse(self._request("REST", self.REST_HEADERS, **kwargs))
 
     def saml_request(self, **kwargs) -> SAMLAssertion:
         """Performs a SAML request and returns a SAML response"""
-        if "method" not in kwargs:
-            kwargs["method"] = "get"
-
-        kwargs["headers"] = {
-            **{
-                "Accept": "text/html",
-                "Content-Type": "text/html",
-            },
-            **kwargs.get("headers", {}),
-        }
-
-        response = self._client.request(**kwargs)
-        log.debug(
-            f"SAML response ({response.status_code}): {response.content.decode()}"
-        )
+        kwargs.setdefault("method", "get")
+        response = self._request("SAML", self.HTML_HEADERS, **kwargs)
 
-        parser = bs4.BeautifulSoup(response.content, "html.parser")
-        try:
-            response_saml = next(
-                (
-                    tag.get("value")
-                    for tag in parser.find_all("input")
-                    if tag.get("name") == "SAMLResponse"
-                )
-            )
-        except StopIteration:
+        response_saml = find_saml_response(response.content)
+        if response_saml is None:
             raise Exception("SAML assertion not found")
 
         return SAMLAssertion(response_saml)
+
+
+SAML_RESPONSE_INPUT_RE = re.compile(
+    rb"""<input\b[^>]*(?<![\w-])name\s*=\s*["']SAMLResponse["'][^>]*>""", re.IGNORECASE
+)
+HTML_VALUE_ATTR_RE = re.compile(
+    rb"""(?<![\w-])value\s*=\s*(["'])(.*?)\1""", re.IGNORECASE
+)
+
+
+def find_saml_response(content: bytes) -> Union[str, None]:
+    """Returns the value of the SAMLResponse form input in an HTML document.
+    Tries a regex first (IdP forms are simple and predictable) and falls back
+    to a full HTML parse."""
+    tag = SAML_RESPONSE_INPUT_RE.search(content)
+    if tag:
+        value = HTML_VALUE_ATTR_RE.search(tag.group(0))
+        if value:
+            return html.unescape(value.group(2).decode())
+
+    parser = bs4.BeautifulSoup(content, "html.parser")
+    return next(
+        (
+            tag.get("value")
+            for tag in parser.find_all("input")
+            if tag.get("name") == "SAMLResponse"
+        ),
+        None,
+    )
@@ -1,7 +1,8 @@
 from collections.abc import MutableMapping
+import contextlib
 import json
 import logging
-from typing import Any, Iterable
+from typing import Any, Iterable, Iterator
 
 import keyring
 import keyring.errors
@@ -21,6 +22,8 @@ class KeyringItem(MutableMapping):
         self._name = name
 
         self._data = {}
+        self._dirty = False
+        self._batch_depth = 0
         self.update(initial) if initial else self.load()
 
     @property
@@ -37,14 +40,14 @@ class KeyringItem(MutableMapping):
         del self._data[k]
 
     def __iter__(self) -> Iterable:
-        return (k for k in self._data)
+        return iter(self._data)
 
     def __len__(self) -> int:
         return len(self._data)
 
     def asdict(self) -> dict:
         """Return the item as a dict"""
-        return dict(self)
+        return self._data.copy()
 
     def load(self) -> None:
         """Loads data from a keyring item"""
@@ -53,23 +56,57 @@ class KeyringItem(MutableMapping):
                 str(keyring.get_password(self._service, self._name))
             )
             log.debug(
-                f"Loaded keyring data from '{self._service}.{self._name}' with keys={list(self.keys())}"
+                "Loaded keyring data from '%s.%s' with keys=%s",
+                self._service,
+                self._name,
+                self._data.keys(),
             )
         except json.decoder.JSONDecodeError:
             pass
 
     def save(self) -> None:
-        """Saves data to a keyring item"""
+        """Saves data to a keyring item. The write is deferred if a batch is in
+        progress and happens when the outermost batch ends."""
+        if self._batch_depth:
+            self._dirty = True
+            return
+
+        self._dirty = False
+
         log.debug(
-            f"Saving keyring data to '{self._service}.{self._name}' with keys={list(self.keys())}"
-        )
-        keyring.set_password(
-            self._service, self._name, json.dumps(self._data, default=str)
+            "Saving keyring data to '%s.%s' with keys=%s",
+            self._service,
+            self._name,
+            self._data.keys(),
         )
+        data = json.dumps(self._data, default=str, separators=(",", ":"))
+        keyring.set_password(self._service, self._name, data)
+
+    def _flush_if_dirty(self) -> None:
+        """Performs a deferred write, if any"""
+        if self._dirty:
+            self.save()
+
+    @contextlib.contextmanager
+    def batch(self) -> Iterator["KeyringItem"]:
+        """Defers writes until the end of the (outermost) batch, e.g.:
+
+        with item.batch():
+            item["foo"] = "bar"
+            item.save()  # deferred
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self._flush_if_dirty()
 
     def delete(self) -> None:
         """Deletes a keyring item"""
         log.debug(f"Deleting keyring item: '{self._service}.{self._name}'")
+        self._dirty = False
         try:
             keyring.delete_password(self._service, self._name)
             self._data = {}
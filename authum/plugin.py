@@ -1,4 +1,6 @@
+import hashlib
 import importlib
+import json
 import logging
 import os
 import pkgutil
@@ -6,10 +8,17 @@ import sys
 
 import pluggy
 
+import authum
+
 
 PLUGIN_MODULE_BUILTIN_PATH = os.path.join(os.path.dirname(__file__), "plugins")
 PLUGIN_MODULE_BUILTIN_PREFIX = f"{__package__}.plugins."
 PLUGIN_MODULE_PREFIX = f"{__package__}-"
+PLUGIN_CACHE_PATH = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+    __package__,
+    "plugins.json",
+)
 
 log = logging.getLogger(__name__)
 
@@ -55,6 +64,46 @@ def saml_request(url):
     pass
 
 
+def find_plugin_modules(*extra_paths: str) -> list:
+    """Returns the names of external plugin modules found on sys.path.
+    Scanning sys.path is slow, so results are cached in PLUGIN_CACHE_PATH,
+    keyed by the authum version and the sys.path entries with their
+    modification times (installing a package modifies its parent directory).
+    """
+    sys.path = list(extra_paths) + sys.path
+
+    key_data = [authum.metadata["Version"]]
+    for path in sys.path:
+        try:
+            key_data.append([path, os.stat(path or ".").st_mtime])
+        except OSError:
+            key_data.append([path, None])
+    key = hashlib.sha256(json.dumps(key_data).encode()).hexdigest()
+
+    try:
+        with open(PLUGIN_CACHE_PATH) as f:
+            cache = json.load(f)
+        if cache.get("key") == key:
+            return cache["modules"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    module_names = [
+        m.name
+        for m in pkgutil.iter_modules()
+        if m.name.startswith(PLUGIN_MODULE_PREFIX)
+    ]
+
+    try:
+        os.makedirs(os.path.dirname(PLUGIN_CACHE_PATH), exist_ok=True)
+        with open(PLUGIN_CACHE_PATH, "w") as f:
+            json.dump({"key": key, "modules": module_names}, f)
+    except OSError as e:
+        log.debug(f"Unable to write plugin cache: {e}")
+
+    return module_names
+
+
 def load_plugins(*extra_paths: str) -> list:
     """Imports and registers plugin modules"""
     module_names = [
@@ -63,13 +112,7 @@ def load_plugins(*extra_paths: str) -> list:
             path=[PLUGIN_MODULE_BUILTIN_PATH], prefix=PLUGIN_MODULE_BUILTIN_PREFIX
         )
     ]
-
-    sys.path = list(extra_paths) + sys.path
-    module_names += [
-        m.name
-        for m in pkgutil.iter_modules()
-        if m.name.startswith(PLUGIN_MODULE_PREFIX)
-    ]
+    module_names += find_plugin_modules(*extra_paths)
 
     return [manager.register(importlib.import_module(m)) for m in module_names]
 
@@ -1,4 +1,7 @@
+from __future__ import annotations
+
 import click
+import operator
 import os
 import rich.table
 import sys
@@ -8,6 +11,14 @@ import authum.plugins.aws.lib
 import authum.util
 
 
+def get_credentials(name: str) -> authum.plugins.aws.lib.AWSRoleCredentials:
+    """Returns credentials by name"""
+    try:
+        return authum.plugins.aws.lib.aws_data().credentials(name)
+    except KeyError:
+        raise click.ClickException(f"No such credentials: {name}")
+
+
 @authum.plugin.hookimpl
 def extend_cli(click_group):
     @click_group.group()
@@ -96,12 +107,14 @@ def extend_cli(click_group):
     @click.argument("command", nargs=-1, type=click.UNPROCESSED)
     def exec(rotate: bool, name: str, command: tuple):
         """Run a shell command with the selected credentials"""
-        aws_data = authum.plugins.aws.lib.AWSData()
-        credentials = aws_data.credentials(name)
+        credentials = get_credentials(name)
         credentials.renew(force=rotate)
+        if not command:
+            exit(0)
+
         executable = os.path.basename(sys.argv[0])
         try:
-            exit(credentials.exec(command).returncode)
+            credentials.execvpe(command)
         except PermissionError:
             authum.util.rich_stderr.print(
                 f"{executable}: permission denied: {command[0]}"
@@ -118,20 +131,19 @@ def extend_cli(click_group):
     @click.argument("name")
     def export(rotate: bool, name: str):
         """Export AWS_* environment variables for the selected credentials"""
-        aws_data = authum.plugins.aws.lib.AWSData()
-        credentials = aws_data.credentials(name)
+        credentials = get_credentials(name)
         credentials.renew(force=rotate)
         authum.util.rich_stdout.print(credentials.env_vars_export)
 
     @aws.command()
     def ls():
         """List credentials"""
-        aws_data = authum.plugins.aws.lib.AWSData()
-        if not aws_data.list_credentials:
+        list_credentials = authum.plugins.aws.lib.aws_data().list_credentials
+        if not list_credentials:
             authum.util.rich_stderr.print("No credentials")
             return
 
-        for name, credentials in sorted(aws_data.list_credentials.items()):
+        for name, credentials in sorted(list_credentials.items()):
             table = rich.table.Table(title=name, **authum.util.rich_table_vertical_opts)
 
             if hasattr(credentials, "start_url"):
@@ -169,7 +181,7 @@ def extend_cli(click_group):
             start_url=authum.plugins.aws.lib.normalize_start_url(start_url_or_subdomain)
         )
         for account in sorted(
-            client.list_accounts(), key=lambda a: (a["accountName"], a["accountId"])
+            client.list_accounts(), key=operator.itemgetter("accountName", "accountId")
         ):
             table = rich.table.Table(
                 title=account["accountName"], **authum.util.rich_table_vertical_opts
@@ -185,7 +197,7 @@ def extend_cli(click_group):
     @click.argument("new_name")
     def mv(ctx: click.Context, current_name: str, new_name: str):
         """Rename credentials"""
-        aws_data = authum.plugins.aws.lib.AWSData()
+        aws_data = authum.plugins.aws.lib.aws_data()
         try:
             aws_data.mv_credentials(current_name, new_name)
         except KeyError:
@@ -198,7 +210,7 @@ def extend_cli(click_group):
     @click.argument("name", required=False)
     def rm(ctx: click.Context, all: bool, name: str):
         """Remove credentials"""
-        aws_data = authum.plugins.aws.lib.AWSData()
+        aws_data = authum.plugins.aws.lib.aws_data()
         if all:
             aws_data.delete()
         elif name:
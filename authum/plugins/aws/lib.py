@@ -1,17 +1,24 @@
+from __future__ import annotations
+
 import abc
+import concurrent.futures
+import contextlib
 import dataclasses
 import datetime
+import functools
 import itertools
 import logging
 import os
+import random
+import re
+import shlex
 import subprocess
+import sys
 import time
-from typing import ClassVar, Union
+from typing import Callable, ClassVar, Dict, Iterator, NoReturn, Tuple, Union
+import uuid
 import webbrowser
 
-import arn.iam
-import boto3
-
 import authum
 import authum.http
 import authum.persistence
@@ -22,23 +29,56 @@ import authum.util
 logging.getLogger("botocore").propagate = False
 log = logging.getLogger(__name__)
 
+# Failed requests with these error codes are not retried for
+# NEGATIVE_CACHE_TTL_S seconds (see negative_cache()). Only errors caused by
+# the requested role belong here, not errors caused by the caller's
+# credentials (e.g. InvalidClientTokenId), which may be renewed meanwhile.
+NEGATIVE_CACHE_ERROR_CODES = ("AccessDenied", "ValidationError")
+NEGATIVE_CACHE_TTL_S = 120
+_negative_cache: Dict[tuple, Tuple[float, str, str]] = {}
+
+SAML_ROLE_ATTRIBUTE = "https://aws.amazon.com/SAML/Attributes/Role"
+SAML_SESSION_DURATION_ATTRIBUTE = (
+    "https://aws.amazon.com/SAML/Attributes/SessionDuration"
+)
+
+# Retry throttled AWS requests with client-side rate limiting
+BOTO_RETRIES = {"max_attempts": 10, "mode": "adaptive"}
+
 
 class AWSData(authum.persistence.KeyringItem):
     """Represents persistent AWS data"""
 
     def __init__(self) -> None:
+        self._credentials_cache: Dict[
+            str, Union[AWSSSORoleCredentials, AWSSAMLRoleCredentials]
+        ] = {}
         super().__init__("aws")
 
-    def set_credentials(self, name: str, v: "AWSRoleCredentials") -> None:
+    def set_credentials(self, name: str, v: AWSRoleCredentials) -> None:
         """Save credentials"""
-        self.setdefault("credentials", {})[name] = dataclasses.asdict(v)
+        self.setdefault("credentials", {})[name] = v.asdict()
         self.save()
 
     def credentials(
         self, name: str
-    ) -> Union["AWSSSORoleCredentials", "AWSSAMLRoleCredentials"]:
-        """Return credentials by name"""
-        args = self["credentials"][name]
+    ) -> Union[AWSSSORoleCredentials, AWSSAMLRoleCredentials]:
+        """Return credentials by name (reusing unexpired objects until the next
+        save)"""
+        credentials = self._credentials_cache.get(name)
+        if credentials is None or credentials.is_expired:
+            args = self.get("credentials", {}).get(name)
+            if args is None:
+                raise KeyError(name)
+            credentials = self._role_credentials(args)
+            self._credentials_cache[name] = credentials
+        return credentials
+
+    @staticmethod
+    def _role_credentials(
+        args: dict,
+    ) -> Union[AWSSSORoleCredentials, AWSSAMLRoleCredentials]:
+        """Construct the appropriate credentials object from cached fields"""
         if "start_url" in args:
             return AWSSSORoleCredentials(**args)
         else:
@@ -51,22 +91,59 @@ class AWSData(authum.persistence.KeyringItem):
 
     def rm_credentials(self, name: str) -> None:
         """Delete a credentials by name"""
-        del self.get("credentials", {})[name]
+        credentials = self.get("credentials", {})
+        if name not in credentials:
+            raise KeyError(name)
+        del credentials[name]
         self.save()
 
-    @property
+    def save(self) -> None:
+        self._invalidate_credentials()
+        super().save()
+
+    def delete(self) -> None:
+        super().delete()
+        self._invalidate_credentials()
+
+    def _invalidate_credentials(self) -> None:
+        """Drop credentials objects built from the previous data"""
+        self._credentials_cache.clear()
+        self.__dict__.pop("list_credentials", None)
+
+    @functools.cached_property
     def list_credentials(self) -> dict:
-        """Return all role credentials as a dict"""
+        """Return all role credentials as a dict (cached until the next save)"""
         return {
-            name: self.credentials(name) for name in self.get("credentials", {}).keys()
+            name: self._role_credentials(args)
+            for name, args in self.get("credentials", {}).items()
         }
 
 
+@functools.lru_cache(maxsize=1)
+def aws_data() -> AWSData:
+    """Returns the AWSData instance shared by the CLI and cached AWS objects"""
+    return AWSData()
+
+
+def batched_cache_writes(func: Callable) -> Callable:
+    """Decorator for CacheableAWSObject methods that defers cache writes until
+    the method returns, so that nested renewals are saved at once"""
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        with self.cache.batch():
+            return func(self, *args, **kwargs)
+
+    return wrapper
+
+
 @dataclasses.dataclass
 class CacheableAWSObject(abc.ABC):
     """Represents a cacheable AWS object"""
 
-    cache: ClassVar[AWSData] = AWSData()
+    cache: ClassVar[AWSData] = aws_data()
+    # Objects are renewed when their TTL drops below this many seconds
+    REFRESH_MARGIN_S: ClassVar[int] = 60
     expiration_timestamp: float = 0
 
     @abc.abstractmethod
@@ -82,30 +159,43 @@ class CacheableAWSObject(abc.ABC):
     @property
     def ttl(self) -> datetime.timedelta:
         """Computes time to live"""
-        now = datetime.datetime.now(datetime.timezone.utc)
         try:
-            expiration = datetime.datetime.fromtimestamp(
-                float(self.expiration_timestamp), tz=datetime.timezone.utc
-            )
+            seconds = float(self.expiration_timestamp) - time.time()
         except ValueError:
-            expiration = now
+            seconds = 0
 
-        return expiration - now
+        return datetime.timedelta(seconds=seconds)
 
     @property
     def is_expired(self) -> bool:
-        """Checks whether the object is expired"""
-        return self.ttl < datetime.timedelta()
+        """Checks whether the object is expired (or about to expire)"""
+        return self.ttl < datetime.timedelta(seconds=self.REFRESH_MARGIN_S)
 
     @property
     def ttl_str(self) -> str:
         """Fix for normalization of negative values for ttl.
 
         See: https://docs.python.org/3/library/datetime.html#timedelta-objects"""
-        ttl = str(abs(self.ttl))
-        if self.is_expired:
-            ttl = f"-{ttl}"
-        return ttl
+        ttl = self.ttl
+        ttl_str = str(abs(ttl))
+        if ttl < datetime.timedelta():
+            ttl_str = f"-{ttl_str}"
+        return ttl_str
+
+    def asdict(self) -> dict:
+        """Return the object's fields as a dict. Unlike dataclasses.asdict(),
+        this doesn't deep-copy values (all fields are scalars)."""
+        return {f.name: getattr(self, f.name) for f in dataclasses.fields(self)}
+
+    def save_to_cache(self, cache: dict, key: str) -> None:
+        """Store the object under cache[key], saving only if it changed"""
+        data = self.asdict()
+        if cache.get(key) == data:
+            log.debug(f"{type(self).__name__} unchanged, skipping cache save")
+            return
+
+        cache[key] = data
+        self.cache.save()
 
     def load_cached_fields(
         self,
@@ -152,7 +242,7 @@ class AWSSSORegistration(CacheableAWSObject):
 
         log.debug(f"Renewing SSO client registration")
         if not boto_sso_oidc_client:
-            boto_sso_oidc_client = boto3.client("sso-oidc")
+            boto_sso_oidc_client = boto_client("sso-oidc")
         response = boto_sso_oidc_client.register_client(
             clientName=authum.metadata["Name"], clientType="public"
         )
@@ -162,8 +252,7 @@ class AWSSSORegistration(CacheableAWSObject):
         self.client_secret = response["clientSecret"]
         self.expiration_timestamp = float(response["clientSecretExpiresAt"])
 
-        self.cache.setdefault("sso", {})["registration"] = dataclasses.asdict(self)
-        self.cache.save()
+        self.save_to_cache(self.cache.setdefault("sso", {}), "registration")
 
 
 @dataclasses.dataclass
@@ -197,7 +286,7 @@ class AWSSSOAuthorization(CacheableAWSObject):
 
         log.debug(f"Renewing SSO client authorization for: {self.start_url}")
         if not boto_sso_oidc_client:
-            boto_sso_oidc_client = boto3.client("sso-oidc")
+            boto_sso_oidc_client = boto_client("sso-oidc")
         authorization = boto_sso_oidc_client.start_device_authorization(
             clientId=registration.client_id,
             clientSecret=registration.client_secret,
@@ -209,7 +298,7 @@ class AWSSSOAuthorization(CacheableAWSObject):
             webbrowser.open(authorization["verificationUriComplete"])
 
         response = {}
-        interval = authorization["interval"]
+        interval = max(1, authorization["interval"])
         for i in itertools.count(1):
             try:
                 log.debug(f"Requesting SSO client token (try: {i})")
@@ -226,7 +315,8 @@ class AWSSSOAuthorization(CacheableAWSObject):
             except boto_sso_oidc_client.exceptions.SlowDownException:
                 interval += 5
                 pass
-            time.sleep(interval)
+            # Jitter keeps concurrent processes from polling in lockstep
+            time.sleep(interval + random.uniform(0, interval * 0.25))
 
         self.access_token = response["accessToken"]
         self.expiration_timestamp = datetime.datetime.timestamp(
@@ -234,10 +324,10 @@ class AWSSSOAuthorization(CacheableAWSObject):
             + datetime.timedelta(seconds=response["expiresIn"])
         )
 
-        self.cache.setdefault("sso", {}).setdefault("authorization", {})[
-            self.start_url
-        ] = dataclasses.asdict(self)
-        self.cache.save()
+        self.save_to_cache(
+            self.cache.setdefault("sso", {}).setdefault("authorization", {}),
+            self.start_url,
+        )
 
 
 class AWSSSOClient:
@@ -264,36 +354,40 @@ class AWSSSOClient:
                 launch_web_browser=launch_web_browser,
             )
 
-    def list_accounts(self, boto_sso_client=None) -> list:
-        """Returns a list of available accounts and roles"""
-        account_list = []
-
+    def list_accounts(self, boto_sso_client=None, max_workers: int = 8) -> list:
+        """Returns a list of available accounts and roles. Roles are requested
+        for several accounts concurrently."""
         log.debug(f"Requesting account list")
         if not boto_sso_client:
-            boto_sso_client = boto3.client("sso")
-        accounts = boto_sso_client.list_accounts(
+            boto_sso_client = boto_client("sso")
+        accounts = []
+        for page in boto_sso_client.get_paginator("list_accounts").paginate(
             accessToken=self.authorization.access_token
-        )
-        log.debug(f"AWS response: {accounts}")
+        ):
+            log.debug(f"AWS response: {page}")
+            accounts += page["accountList"]
 
-        for account in accounts["accountList"]:
+        def list_account_roles(account: dict) -> dict:
             log.debug(f"Requesting roles for account: {account['accountId']}")
-            roles = boto_sso_client.list_account_roles(
+            roles = []
+            for page in boto_sso_client.get_paginator("list_account_roles").paginate(
                 accessToken=self.authorization.access_token,
                 accountId=account["accountId"],
-            )
-            log.debug(f"AWS response: {roles}")
-            account_list.append(
-                {**account, "roles": [r["roleName"] for r in roles["roleList"]]}
-            )
+            ):
+                log.debug(f"AWS response: {page}")
+                roles += [r["roleName"] for r in page["roleList"]]
+            return {**account, "roles": roles}
 
-        return account_list
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(list_account_roles, accounts))
 
 
 @dataclasses.dataclass
 class AWSRoleCredentials(CacheableAWSObject):
     """Base class for AWS role credentials"""
 
+    REFRESH_MARGIN_S: ClassVar[int] = 300
+
     name: str = ""
     access_key_id: str = ""
     secret_access_key: str = ""
@@ -324,7 +418,9 @@ class AWSRoleCredentials(CacheableAWSObject):
     def env_vars_export(self) -> str:
         """Returns a list of credential environment variables suitable for
         eval'ing in a shell"""
-        return "\n".join(f"export {k}='{v}'" for k, v in self.env_vars.items())
+        return "\n".join(
+            f"export {k}={shlex.quote(v)}" for k, v in self.env_vars.items()
+        )
 
     def exec(self, command: tuple, capture_output=False) -> subprocess.CompletedProcess:
         """Runs a shell command with AWS_* environment variables set"""
@@ -332,38 +428,51 @@ class AWSRoleCredentials(CacheableAWSObject):
             return subprocess.CompletedProcess(command, 0)
         return subprocess.run(
             args=command,
-            env={**dict(os.environ), **self.env_vars},
+            env={**os.environ, **self.env_vars},
             capture_output=capture_output,
             text=True,
         )
 
+    def execvpe(self, command: tuple) -> NoReturn:
+        """Replaces the current process with a shell command with AWS_*
+        environment variables set"""
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.execvpe(command[0], command, {**os.environ, **self.env_vars})
+
+    @property
+    def role_session_name(self) -> str:
+        """Returns a session name for assumed roles, derived from the
+        credentials name. STS allows 2-64 characters from [\\w+=,.@-]."""
+        name = re.sub(r"[^\w+=,.@-]", "-", self.name)[:64]
+        if len(name) < 2:
+            name = f"{authum.metadata['Name']}-{uuid.uuid4().hex[:16]}"
+        return name
+
     def assume_role(self, boto_sts_client=None):
         """Assumes a role"""
 
         if not boto_sts_client:
-            boto_sts_client = boto3.client(
+            boto_sts_client = boto_client(
                 "sts",
+                endpoint_url=self.sts_endpoint if self.sts_endpoint else None,
                 aws_access_key_id=self.access_key_id,
                 aws_secret_access_key=self.secret_access_key,
                 aws_session_token=self.session_token,
-                endpoint_url=self.sts_endpoint if self.sts_endpoint else None,
             )
 
-        log.debug(f"Requesting STS caller identity")
-        response = boto_sts_client.get_caller_identity()
-        log.debug(f"AWS response: {response}")
-
         assume_role_args = {
             "RoleArn": self.assume_role_arn,
-            "RoleSessionName": arn.iam.AssumedRoleArn(
-                response["Arn"]
-            ).role_session_name,
+            "RoleSessionName": self.role_session_name,
         }
         if self.assume_role_external_id:
             assume_role_args["ExternalId"] = self.assume_role_external_id
 
         log.debug(f"Assuming role: {self.assume_role_arn}")
-        response = boto_sts_client.assume_role(**assume_role_args)
+        with negative_cache(
+            "assume_role", self.assume_role_arn, self.assume_role_external_id
+        ):
+            response = boto_sts_client.assume_role(**assume_role_args)
         log.debug(f"AWS response: {response}")
 
         self.access_key_id = response["Credentials"]["AccessKeyId"]
@@ -384,6 +493,7 @@ class AWSSSORoleCredentials(AWSRoleCredentials):
         super().__post_init__()
         self.require_fields("start_url", "account_id", "role_name")
 
+    @batched_cache_writes
     def renew(
         self,
         force: bool = False,
@@ -402,7 +512,7 @@ class AWSSSORoleCredentials(AWSRoleCredentials):
             f"Renewing SSO role credentials for: start_url={self.start_url}, account_id={self.account_id}, role_name={self.role_name}"
         )
         if not boto_sso_client:
-            boto_sso_client = boto3.client("sso")
+            boto_sso_client = boto_client("sso")
         response = boto_sso_client.get_role_credentials(
             accessToken=sso_client.authorization.access_token,
             accountId=self.account_id,
@@ -418,8 +528,7 @@ class AWSSSORoleCredentials(AWSRoleCredentials):
         if self.assume_role_arn:
             self.assume_role(boto_sts_client=boto_sts_client)
 
-        self.cache.setdefault("credentials", {})[self.name] = dataclasses.asdict(self)
-        self.cache.save()
+        self.save_to_cache(self.cache.setdefault("credentials", {}), self.name)
 
 
 @dataclasses.dataclass
@@ -432,6 +541,7 @@ class AWSSAMLRoleCredentials(AWSRoleCredentials):
         super().__post_init__()
         self.require_fields("saml_url")
 
+    @batched_cache_writes
     def renew(self, force: bool = False):
         """Renew attributes from AWS"""
         self.load()
@@ -446,28 +556,24 @@ class AWSSAMLRoleCredentials(AWSRoleCredentials):
 
         assume_role_args = {"SAMLAssertion": assertion.b64encoded}
 
-        try:
-            role = assertion.attrs["https://aws.amazon.com/SAML/Attributes/Role"][0]
-            assume_role_args["RoleArn"], assume_role_args["PrincipalArn"] = role.split(
-                ","
-            )
-        except IndexError:
+        attrs = assertion.attrs
+        role = next(iter(attrs.get(SAML_ROLE_ATTRIBUTE, ())), None)
+        if not role:
             raise AWSPluginError(f"No role ARN found in SAML assertion")
+        assume_role_args["RoleArn"], assume_role_args["PrincipalArn"] = role.split(",")
 
-        try:
-            assume_role_args["DurationSeconds"] = int(
-                assertion.attrs[
-                    "https://aws.amazon.com/SAML/Attributes/SessionDuration"
-                ][0]
-            )
-        except IndexError:
-            pass
+        duration = next(iter(attrs.get(SAML_SESSION_DURATION_ATTRIBUTE, ())), None)
+        if duration:
+            assume_role_args["DurationSeconds"] = int(duration)
 
         log.debug(f"Renewing SAML role credentials for: {self.saml_url}")
-        boto_sts_client = boto3.client(
+        boto_sts_client = boto_client(
             "sts", endpoint_url=self.sts_endpoint if self.sts_endpoint else None
         )
-        response = boto_sts_client.assume_role_with_saml(**assume_role_args)
+        with negative_cache(
+            "assume_role_with_saml", self.saml_url, assume_role_args["RoleArn"]
+        ):
+            response = boto_sts_client.assume_role_with_saml(**assume_role_args)
         log.debug(f"AWS response: {response}")
 
         self.access_key_id = response["Credentials"]["AccessKeyId"]
@@ -478,14 +584,64 @@ class AWSSAMLRoleCredentials(AWSRoleCredentials):
         if self.assume_role_arn:
             self.assume_role()
 
-        self.cache.setdefault("credentials", {})[self.name] = dataclasses.asdict(self)
-        self.cache.save()
+        self.save_to_cache(self.cache.setdefault("credentials", {}), self.name)
+
+
+@functools.lru_cache(maxsize=32)
+def boto_client(
+    service_name: str,
+    endpoint_url: Union[str, None] = None,
+    aws_access_key_id: Union[str, None] = None,
+    aws_secret_access_key: Union[str, None] = None,
+    aws_session_token: Union[str, None] = None,
+):
+    """Returns a (cached) boto3 client. Creating a client loads and parses
+    botocore service models, so clients are reused for identical arguments."""
+    import boto3
+    import botocore.config
+
+    return boto3.client(
+        service_name,
+        endpoint_url=endpoint_url,
+        aws_access_key_id=aws_access_key_id,
+        aws_secret_access_key=aws_secret_access_key,
+        aws_session_token=aws_session_token,
+        config=botocore.config.Config(retries=BOTO_RETRIES, tcp_keepalive=True),
+    )
+
+
+@contextlib.contextmanager
+def negative_cache(*key: str) -> Iterator[None]:
+    """Remembers AWS requests that were rejected (e.g. because of a
+    misconfigured role ARN) and raises an AWSPluginError with the same error
+    for a while instead of repeating the request"""
+    import botocore.exceptions
+
+    cached = _negative_cache.get(key)
+    if cached and cached[0] > time.time():
+        log.debug(f"Using cached error for: {key}")
+        raise AWSPluginError(f"{cached[1]}: {cached[2]}")
+
+    try:
+        yield
+    except botocore.exceptions.ClientError as e:
+        error = e.response.get("Error", {})
+        if error.get("Code") in NEGATIVE_CACHE_ERROR_CODES:
+            _negative_cache[key] = (
+                time.time() + NEGATIVE_CACHE_TTL_S,
+                error["Code"],
+                error.get("Message", ""),
+            )
+        raise
+
+    _negative_cache.pop(key, None)
 
 
 class AWSPluginError(Exception):
     """Represents AWS plugin errors"""
 
 
+@functools.lru_cache(maxsize=64)
 def normalize_start_url(
     subdomain_or_url: str,
     scheme: str = "https://",
@@ -1,4 +1,7 @@
-from typing import Type
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Type
 
 import click
 import rich.table
@@ -48,7 +51,7 @@ def prompt_factor_args(factor_type: str, gui: bool = authum.gui.PROMPT_GUI) -> d
 
 def get_jumpcloud_client(fail_unconfigured: bool = True) -> Type:
     """Returns a JumpCloud client"""
-    jumpcloud_data = authum.plugins.jumpcloud.lib.JumpCloudData()
+    jumpcloud_data = authum.plugins.jumpcloud.lib.jumpcloud_data()
     if not jumpcloud_data.email or not jumpcloud_data.password:
         if fail_unconfigured:
             raise click.ClickException("JumpCloud plugin is not configured")
@@ -61,6 +64,9 @@ def get_jumpcloud_client(fail_unconfigured: bool = True) -> Type:
         session=jumpcloud_data.session,
     )
 
+    if client.session.recently_verified:
+        return client
+
     try:
         client.auth(lazy=True)
 
@@ -73,39 +79,56 @@ def get_jumpcloud_client(fail_unconfigured: bool = True) -> Type:
         with authum.util.rich_stderr.status("Waiting for MFA verification"):
             getattr(e.client, f"auth_{factor['type']}")(**factor_args)
 
+    client.session.verified_at = time.time()
     jumpcloud_data.session = client.session
 
     return client
 
 
+def with_session_retry(
+    client: authum.plugins.jumpcloud.lib.JumpCloudClient,
+    call: Callable[[authum.plugins.jumpcloud.lib.JumpCloudClient], Any],
+) -> Any:
+    """Returns call(client). If JumpCloud rejects the session, it's marked as
+    unverified and the call is retried once with a re-authenticated client."""
+    try:
+        return call(client)
+    except authum.plugins.jumpcloud.lib.JumpCloudSessionError:
+        jumpcloud_data = authum.plugins.jumpcloud.lib.jumpcloud_data()
+        session = jumpcloud_data.session
+        session.verified_at = 0
+        jumpcloud_data.session = session
+        return call(get_jumpcloud_client())
+
+
 @authum.plugin.hookimpl
 def extend_cli(click_group):
-    jumpcloud_data = authum.plugins.jumpcloud.lib.JumpCloudData()
-
     @click_group.command()
     @click.option(
         "--email",
         "-e",
-        default=jumpcloud_data.email,
+        default=lambda: authum.plugins.jumpcloud.lib.jumpcloud_data().email,
         help="Set JumpCloud email",
-        show_default=True,
+        show_default="current value",
     )
     @click.option("--password", "-p", is_flag=True, help="Set JumpCloud password")
     @click.option("--rm-session", is_flag=True, help="Delete JumpCloud session data")
     @click.option("--rm", is_flag=True, help="Delete all JumpCloud data")
     def jumpcloud(email: str, password: str, rm_session: bool, rm: bool) -> None:
         """Manage JumpCloud configuration"""
+        jumpcloud_data = authum.plugins.jumpcloud.lib.jumpcloud_data()
         if rm:
             jumpcloud_data.delete()
         else:
-            if email:
-                jumpcloud_data.email = email
-            if password:
-                jumpcloud_data.password = click.prompt(
-                    f"JumpCloud password", hide_input=True
-                )
-            if rm_session:
-                jumpcloud_data.session = {}
+            with jumpcloud_data.batch():
+                if email:
+                    jumpcloud_data.email = email
+                if password:
+                    jumpcloud_data.password = click.prompt(
+                        f"JumpCloud password", hide_input=True
+                    )
+                if rm_session:
+                    jumpcloud_data.session = {}
 
         table = rich.table.Table(
             title="JumpCloud Configuration", **authum.util.rich_table_vertical_opts
@@ -122,9 +145,14 @@ def list_apps():
     if not client:
         return []
 
+    try:
+        applications = with_session_retry(client, lambda c: c.applications())
+    except authum.plugins.jumpcloud.lib.JumpCloudError as e:
+        raise click.ClickException(str(e))
+
     return [
         authum.http.SSOApplication(name=app["displayLabel"], url=app["ssoUrl"])
-        for app in client.applications()
+        for app in applications
     ]
 
 
@@ -135,6 +163,6 @@ def saml_request(url):
     ):
         client = get_jumpcloud_client()
         try:
-            return client.saml_request(url=url)
+            return with_session_retry(client, lambda c: c.saml_request(url=url))
         except authum.plugins.jumpcloud.lib.JumpCloudError as e:
             raise click.ClickException(str(e))
@@ -1,6 +1,8 @@
 import dataclasses
+import functools
 import logging
-from typing import Type, Union
+import time
+from typing import Set, Type, Union
 
 import authum.duo
 import authum.http
@@ -11,6 +13,9 @@ log = logging.getLogger(__name__)
 JUMPCLOUD_SSO_DOMAIN = "sso.jumpcloud.com"
 JUMPCLOUD_SESSION_COOKIE = "_jumpcloud_user_console_"
 
+# Sessions verified within this many seconds are reused without another check
+SESSION_VERIFY_INTERVAL_S = 300
+
 
 @dataclasses.dataclass
 class JumpCloudClientSession:
@@ -18,41 +23,49 @@ class JumpCloudClientSession:
 
     cookie: str = ""
     xsrf: str = ""
+    verified_at: float = 0
+
+    @property
+    def recently_verified(self) -> bool:
+        """Checks whether the session was verified within the last
+        SESSION_VERIFY_INTERVAL_S seconds"""
+        return time.time() - self.verified_at < SESSION_VERIFY_INTERVAL_S
 
 
 class JumpCloudClient(authum.http.HTTPClient):
     """Handles communication with the JumpCloud API"""
 
+    urls = {
+        k: f"https://console.jumpcloud.com{v}"
+        for k, v in {
+            "applications": "/userconsole/api/applications",
+            "auth": "/userconsole/auth",
+            "auth_totp": "/userconsole/auth/totp",
+            "auth_duo": "/userconsole/auth/duo",
+            "self": "/userconsole/api/self",
+            "xsrf": "/userconsole/xsrf",
+        }.items()
+    }
+
     def __init__(
         self,
         email: str,
         password: str,
-        session: JumpCloudClientSession = JumpCloudClientSession(),
+        session: Union[JumpCloudClientSession, None] = None,
     ) -> None:
         super().__init__()
 
         self._email = email
         self._password = password
-        self._session = session
-
-        self.urls = {
-            k: f"https://console.jumpcloud.com{v}"
-            for k, v in {
-                "applications": "/userconsole/api/applications",
-                "auth": "/userconsole/auth",
-                "auth_totp": "/userconsole/auth/totp",
-                "auth_duo": "/userconsole/auth/duo",
-                "self": "/userconsole/api/self",
-                "xsrf": "/userconsole/xsrf",
-            }.items()
-        }
+        self._session = session if session is not None else JumpCloudClientSession()
+        self._sso_urls: Union[Set[str], None] = None
 
     @property
     def session(self) -> JumpCloudClientSession:
         return self._session
 
     def rest_request(
-        self, url: str, method: str, data: dict = {}
+        self, url: str, method: str, data: Union[dict, None] = None
     ) -> authum.http.RESTResponse:
         """Performs an API request and returns the response"""
         return super().rest_request(
@@ -63,13 +76,13 @@ class JumpCloudClient(authum.http.HTTPClient):
                 "X-Xsrftoken": self._session.xsrf,
             },
             cookies={JUMPCLOUD_SESSION_COOKIE: self._session.cookie},
-            json=data,
+            json=data if data is not None else {},
             allow_redirects=False,
         )
 
     def saml_request(self, url: str) -> authum.http.SAMLAssertion:
         """Performs a SAML request and returns the response"""
-        if url not in [app["ssoUrl"] for app in list(self.applications())]:
+        if url not in self.sso_urls:
             raise JumpCloudError(f"Unknown SSO URL: {url}")
 
         return super().saml_request(
@@ -144,7 +157,21 @@ class JumpCloudClient(authum.http.HTTPClient):
     def applications(self) -> authum.http.RESTResponse:
         """Returns a list of the current user's applications"""
         log.debug("Requesting applications")
-        return self.rest_request(url=self.urls["applications"], method="get")
+        response = self.rest_request(url=self.urls["applications"], method="get")
+        if response.response.status_code in (401, 403) or (
+            "/login" in response.response.headers.get("Location", "")
+        ):
+            raise JumpCloudSessionError(response.get("message", "Session rejected"))
+
+        return response
+
+    @property
+    def sso_urls(self) -> Set[str]:
+        """Returns the SSO URLs of the current user's applications (requested
+        once per client)"""
+        if self._sso_urls is None:
+            self._sso_urls = {app["ssoUrl"] for app in self.applications()}
+        return self._sso_urls
 
     def self(self):
         """Returns information about the current authenticated user"""
@@ -165,6 +192,10 @@ class JumpCloudError(Exception):
     """Represents JumpCloud errors"""
 
 
+class JumpCloudSessionError(JumpCloudError):
+    """Raised when JumpCloud rejects the current session"""
+
+
 class JumpCloudData(authum.persistence.KeyringItem):
     """Represents persistent JumpCloud data"""
 
@@ -185,6 +216,8 @@ class JumpCloudData(authum.persistence.KeyringItem):
 
     @email.setter
     def email(self, v: str) -> None:
+        if v != self.email:
+            self.pop("session", None)
         self["email"] = v
         self.save()
 
@@ -196,7 +229,15 @@ class JumpCloudData(authum.persistence.KeyringItem):
     @session.setter
     def session(self, v: Type) -> None:
         if v:
-            self["session"] = dataclasses.asdict(v)
+            self["session"] = {
+                f.name: getattr(v, f.name) for f in dataclasses.fields(v)
+            }
         elif "session" in self:
             del self["session"]
         self.save()
+
+
+@functools.lru_cache(maxsize=1)
+def jumpcloud_data() -> JumpCloudData:
+    """Returns the JumpCloudData instance shared by the JumpCloud plugin"""
+    return JumpCloudData()
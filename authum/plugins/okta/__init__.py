@@ -1,4 +1,7 @@
-from typing import Type
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Type
 
 import click
 import rich.table
@@ -11,6 +14,9 @@ import authum.plugin
 import authum.plugins.okta.lib
 import authum.util
 
+# Prefer the libyaml-backed dumper when PyYAML was built with it
+YAMLDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
 
 def prompt_mfa(factors: dict, gui: bool = authum.gui.PROMPT_GUI) -> dict:
     """Prompts for multi-factor authentication"""
@@ -33,7 +39,10 @@ def prompt_mfa(factors: dict, gui: bool = authum.gui.PROMPT_GUI) -> dict:
         table.add_column("Profile")
         for i, f in enumerate(factors):
             table.add_row(
-                str(i), f["factorType"], f["provider"], yaml.dump(f["profile"])
+                str(i),
+                f["factorType"],
+                f["provider"],
+                yaml.dump(f["profile"], Dumper=YAMLDumper),
             )
         authum.util.rich_stderr.print(table)
         choice = click.prompt(prompt, type=click.IntRange(min=0, max=len(factors)))
@@ -69,7 +78,7 @@ def prompt_factor_args(factor_type: str, gui: bool = authum.gui.PROMPT_GUI) -> d
 
 def get_okta_client(fail_unconfigured: bool = True) -> Type:
     """Returns an Okta client"""
-    okta_data = authum.plugins.okta.lib.OktaData()
+    okta_data = authum.plugins.okta.lib.okta_data()
     if not okta_data.domain or not okta_data.username or not okta_data.password:
         if fail_unconfigured:
             raise click.ClickException("Okta plugin is not configured")
@@ -83,6 +92,9 @@ def get_okta_client(fail_unconfigured: bool = True) -> Type:
         session=okta_data.session,
     )
 
+    if client.session.recently_verified:
+        return client
+
     try:
         client.authn(lazy=True)
 
@@ -95,29 +107,44 @@ def get_okta_client(fail_unconfigured: bool = True) -> Type:
         with authum.util.rich_stderr.status("Waiting for MFA verification"):
             e.client.verify(e.response, factor["id"], factor_args)
 
+    client.session.verified_at = time.time()
     okta_data.session = client.session
 
     return client
 
 
+def with_session_retry(
+    client: authum.plugins.okta.lib.OktaClient,
+    call: Callable[[authum.plugins.okta.lib.OktaClient], Any],
+) -> Any:
+    """Returns call(client). If Okta rejects the session, it's marked as
+    unverified and the call is retried once with a re-authenticated client."""
+    try:
+        return call(client)
+    except authum.plugins.okta.lib.OktaSessionError:
+        okta_data = authum.plugins.okta.lib.okta_data()
+        session = okta_data.session
+        session.verified_at = 0
+        okta_data.session = session
+        return call(get_okta_client())
+
+
 @authum.plugin.hookimpl
 def extend_cli(click_group):
-    okta_data = authum.plugins.okta.lib.OktaData()
-
     @click_group.command()
     @click.option(
         "--domain",
         "-d",
-        default=okta_data.domain,
+        default=lambda: authum.plugins.okta.lib.okta_data().domain,
         help="Set Okta domain",
-        show_default=True,
+        show_default="current value",
     )
     @click.option(
         "--username",
         "-u",
-        default=okta_data.username,
+        default=lambda: authum.plugins.okta.lib.okta_data().username,
         help="Set Okta username",
-        show_default=True,
+        show_default="current value",
     )
     @click.option("--password", "-p", is_flag=True, help="Set Okta password")
     @click.option("--rm-session", is_flag=True, help="Delete Okta session data")
@@ -126,17 +153,19 @@ def extend_cli(click_group):
         domain: str, username: str, password: str, rm_session: bool, rm: bool
     ) -> None:
         """Manage Okta configuration"""
+        okta_data = authum.plugins.okta.lib.okta_data()
         if rm:
             okta_data.delete()
         else:
-            if domain:
-                okta_data.domain = domain
-            if username:
-                okta_data.username = username
-            if password:
-                okta_data.password = click.prompt("Okta password", hide_input=True)
-            if rm_session:
-                okta_data.session = {}
+            with okta_data.batch():
+                if domain:
+                    okta_data.domain = domain
+                if username:
+                    okta_data.username = username
+                if password:
+                    okta_data.password = click.prompt("Okta password", hide_input=True)
+                if rm_session:
+                    okta_data.session = {}
 
         table = rich.table.Table(
             title="Okta Configuration", **authum.util.rich_table_vertical_opts
@@ -154,18 +183,23 @@ def list_apps():
     if not client:
         return []
 
+    try:
+        app_links = with_session_retry(client, lambda c: c.app_links())
+    except authum.plugins.okta.lib.OktaError as e:
+        raise click.ClickException(str(e))
+
     return [
         authum.http.SSOApplication(name=app["label"], url=app["linkUrl"])
-        for app in client.app_links()
+        for app in app_links
     ]
 
 
 @authum.plugin.hookimpl
 def saml_request(url):
-    okta_data = authum.plugins.okta.lib.OktaData()
+    okta_data = authum.plugins.okta.lib.okta_data()
     if authum.util.url_has_domain(url, okta_data.domain):
         client = get_okta_client()
         try:
-            return client.saml_request(url=url)
+            return with_session_retry(client, lambda c: c.saml_request(url=url))
         except authum.plugins.okta.lib.OktaError as e:
             raise click.ClickException(str(e))
@@ -1,4 +1,5 @@
 import dataclasses
+import functools
 import itertools
 import logging
 import time
@@ -11,6 +12,9 @@ import authum.http
 
 log = logging.getLogger(__name__)
 
+# Sessions verified within this many seconds are reused without another check
+SESSION_VERIFY_INTERVAL_S = 300
+
 
 @dataclasses.dataclass
 class OktaClientSession:
@@ -18,6 +22,13 @@ class OktaClientSession:
 
     id: str = ""
     refresh_url: str = ""
+    verified_at: float = 0
+
+    @property
+    def recently_verified(self) -> bool:
+        """Checks whether the session was verified within the last
+        SESSION_VERIFY_INTERVAL_S seconds"""
+        return time.time() - self.verified_at < SESSION_VERIFY_INTERVAL_S
 
 
 class OktaClient(authum.http.HTTPClient):
@@ -26,30 +37,32 @@ class OktaClient(authum.http.HTTPClient):
     See: https://developer.okta.com/docs/reference/api/
     """
 
+    URL_PATHS = (
+        ("app_links", "/users/me/appLinks"),
+        ("authn", "/authn"),
+        ("sessions", "/sessions"),
+    )
+
     def __init__(
         self,
         domain: str,
         username: str,
         password: str,
-        session: OktaClientSession = OktaClientSession(),
+        session: Union[OktaClientSession, None] = None,
         poll_interval: float = 2.0,
+        poll_min_interval: float = 0.25,
     ) -> None:
         super().__init__()
 
         self._domain = domain
         self._username = username
         self._password = password
-        self._session = session
+        self._session = session if session is not None else OktaClientSession()
         self._poll_interval = poll_interval
+        self._poll_min_interval = min(poll_min_interval, poll_interval)
 
-        self.urls = {
-            k: f"https://{self._domain}/api/v1{v}"
-            for k, v in {
-                "app_links": "/users/me/appLinks",
-                "authn": "/authn",
-                "sessions": "/sessions",
-            }.items()
-        }
+        base_url = f"https://{self._domain}/api/v1"
+        self.urls = {k: base_url + v for k, v in self.URL_PATHS}
 
     @property
     def domain(self) -> str:
@@ -60,7 +73,7 @@ class OktaClient(authum.http.HTTPClient):
         return self._session
 
     def rest_request(
-        self, url: str, method: str, data: dict = {}
+        self, url: str, method: str, data: Union[dict, None] = None
     ) -> authum.http.RESTResponse:
         """Performs an API request and returns the response"""
         return super().rest_request(
@@ -68,7 +81,7 @@ class OktaClient(authum.http.HTTPClient):
             method=method,
             # https://developer.okta.com/docs/guides/session-cookie/overview/
             cookies={"sid": self._session.id},
-            json=data,
+            json=data if data is not None else {},
         )
 
     def saml_request(self, url: str) -> authum.http.SAMLAssertion:
@@ -117,7 +130,7 @@ class OktaClient(authum.http.HTTPClient):
         self,
         mfa_response: authum.http.RESTResponse,
         factor_id: str,
-        factor_args: dict = {},
+        factor_args: Union[dict, None] = None,
     ) -> Union[authum.http.RESTResponse, None]:
         """Performs MFA factor verification.
 
@@ -125,9 +138,10 @@ class OktaClient(authum.http.HTTPClient):
         """
         factor = factor_by_id(mfa_response, factor_id)
         url = factor["_links"]["verify"]["href"]
-        data = {**{"stateToken": mfa_response["stateToken"]}, **factor_args}
+        data = {"stateToken": mfa_response["stateToken"], **(factor_args or {})}
 
         response = None
+        delay = self._poll_min_interval
         for i in itertools.count(1):
             log.debug(f"Checking MFA verification status (try: {i})")
             response = self.rest_request(url=url, method="post", data=data)
@@ -137,7 +151,10 @@ class OktaClient(authum.http.HTTPClient):
 
             factor_result = response.get("factorResult", "")
             if factor_result == "WAITING":
-                time.sleep(self._poll_interval)
+                # Back off exponentially up to poll_interval so that quick
+                # approvals are noticed quickly
+                time.sleep(delay)
+                delay = min(delay * 2, self._poll_interval)
 
             elif response["status"] == "SUCCESS":
                 self.session_create(response["sessionToken"])
@@ -204,7 +221,13 @@ class OktaClient(authum.http.HTTPClient):
         See: https://developer.okta.com/docs/reference/api/users/#get-assigned-app-links
         """
         log.debug("Requesting app links")
-        return self.rest_request(url=self.urls["app_links"], method="get")
+        response = self.rest_request(url=self.urls["app_links"], method="get")
+        if response.response.status_code in (401, 403):
+            raise OktaSessionError(
+                f"{response.get('errorCode')} - {response.get('errorSummary')}"
+            )
+
+        return response
 
 
 class OktaMFARequired(Exception):
@@ -219,6 +242,10 @@ class OktaError(Exception):
     """Represents Okta errors"""
 
 
+class OktaSessionError(OktaError):
+    """Raised when Okta rejects the current session"""
+
+
 def factor_ids_by_type(response: authum.http.RESTResponse, factor_type: str) -> list:
     """Returns all the factor ids of a given type from a response"""
     factors = response["_embedded"]["factors"]
@@ -255,11 +282,15 @@ class OktaData(authum.persistence.KeyringItem):
 
     @domain.setter
     def domain(self, v: str) -> None:
+        if v != self.domain:
+            self.pop("session", None)
         self["domain"] = v
         self.save()
 
     @username.setter
     def username(self, v: str) -> None:
+        if v != self.username:
+            self.pop("session", None)
         self["username"] = v
         self.save()
 
@@ -271,7 +302,15 @@ class OktaData(authum.persistence.KeyringItem):
     @session.setter
     def session(self, v: Type) -> None:
         if v:
-            self["session"] = dataclasses.asdict(v)
+            self["session"] = {
+                f.name: getattr(v, f.name) for f in dataclasses.fields(v)
+            }
         elif "session" in self:
             del self["session"]
         self.save()
+
+
+@functools.lru_cache(maxsize=1)
+def okta_data() -> OktaData:
+    """Returns the OktaData instance shared by the Okta plugin"""
+    return OktaData()
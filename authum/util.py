@@ -1,3 +1,4 @@
+import functools
 from typing import Any
 import urllib.parse
 
@@ -17,19 +18,45 @@ rich_table_vertical_opts = {
     "show_header": False,
 }
 
+# Tables with more rows than this are printed as plain tab-separated text
+rich_table_max_rows = 200
+
 
 def sensitive_value(v: Any) -> str:
     """Hide a sensitive value"""
     return "<sensitive>" if v else ""
 
 
+@functools.lru_cache(maxsize=512)
+def _urlparse(url: str) -> urllib.parse.ParseResult:
+    """Parses a URL (cached, since the same URLs are checked repeatedly)"""
+    return urllib.parse.urlparse(url)
+
+
 def is_url(url: str) -> bool:
     """Checks whether the string is a URL"""
-    o = urllib.parse.urlparse(url)
+    o = _urlparse(url)
     return all([o.scheme, o.netloc])
 
 
 def url_has_domain(url: str, domain: str) -> bool:
     """Checks whether the URL contains the specified domain"""
-    o = urllib.parse.urlparse(url)
+    o = _urlparse(url)
     return o.hostname == domain
+
+
+def print_rows(header: tuple, rows: list) -> None:
+    """Prints rows as a table, or as tab-separated text if there are too many
+    rows to render a table quickly"""
+    if len(rows) > rich_table_max_rows:
+        print("\t".join(header), file=rich_stderr.file)
+        for row in rows:
+            print("\t".join(row), file=rich_stderr.file)
+        return
+
+    table = rich.table.Table(**rich_table_horizontal_opts)
+    for column in header:
+        table.add_column(column)
+    for row in rows:
+        table.add_row(*row)
+    rich_stderr.print(table)
@@ -1,3 +1,5 @@
+import collections
+import functools
 import os
 import pathlib
 from typing import Any
@@ -16,10 +18,10 @@ class TestKeyring(keyring.backend.KeyringBackend):
 
     def __init__(self):
         super().__init__()
-        self._data = {}
+        self._data = collections.defaultdict(dict)
 
     def set_password(self, servicename: str, username: str, password: str) -> None:
-        self._data.setdefault(servicename, {})[username] = password
+        self._data[servicename][username] = password
 
     def get_password(self, servicename: str, username: str) -> Any:
         return self._data.get(servicename, {}).get(username)
@@ -42,11 +44,16 @@ def random_url(random_string):
     return f"http://{random_string}"
 
 
+@functools.lru_cache(maxsize=None)
+def response_data_template(name: str) -> mako.template.Template:
+    path = os.path.join(pathlib.Path(__file__).parent, "response_data", name)
+    with open(path, "r") as f:
+        return mako.template.Template(f.read())
+
+
 @pytest.fixture
 def response_data():
     def _response_data(name: str, **data):
-        path = os.path.join(pathlib.Path(__file__).parent, "response_data", name)
-        with open(path, "r") as f:
-            return mako.template.Template(f.read()).render(**data)
+        return response_data_template(name).render(**data)
 
     return _response_data
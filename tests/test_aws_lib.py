@@ -1,7 +1,14 @@
 import json
 import re
+import shlex
+import subprocess
+import sys
+import time
 
 import boto3
+import botocore.exceptions
+import botocore.paginate
+import botocore.session
 import botocore.stub
 import botocore.utils
 import pytest
@@ -82,6 +89,12 @@ def aws_saml_role_credentials():
     )
 
 
+@pytest.fixture(autouse=True)
+def negative_cache():
+    yield authum.plugins.aws.lib._negative_cache
+    authum.plugins.aws.lib._negative_cache.clear()
+
+
 @pytest.fixture
 def aws_role_credentials(request):
     return request.getfixturevalue(request.param)
@@ -131,6 +144,80 @@ def test_aws_sso_client_list_accounts(response_data, aws_sso_client):
     ]
 
 
+class FakeSSOClient:
+    """Serves SSO pages keyed by (operation, accountId, nextToken), so responses
+    don't depend on the order in which threads make requests. Paginators are
+    real botocore paginators."""
+
+    def __init__(self, pages: dict, delays: dict = {}) -> None:
+        self.pages = pages
+        self.delays = delays
+        self.calls = []
+        session = botocore.session.get_session()
+        self.service_model = session.get_service_model("sso")
+        self.paginator_model = session.get_paginator_model("sso")
+
+    def get_paginator(self, operation: str) -> botocore.paginate.Paginator:
+        name = "".join(w.title() for w in operation.split("_"))
+
+        def method(**kwargs):
+            account_id = kwargs.get("accountId")
+            self.calls.append((operation, account_id, kwargs.get("nextToken")))
+            time.sleep(self.delays.get(account_id, 0))
+            return self.pages[(operation, account_id, kwargs.get("nextToken"))]
+
+        return botocore.paginate.Paginator(
+            method,
+            self.paginator_model.get_paginator(name),
+            self.service_model.operation_model(name),
+        )
+
+
+def test_aws_sso_client_list_accounts_pages(aws_sso_client):
+    accounts = [
+        {"accountId": f"00000000000{i}", "accountName": f"Account {i}"}
+        for i in range(4)
+    ]
+    pages = {
+        ("list_accounts", None, None): {
+            "accountList": accounts[:2],
+            "nextToken": "accounts-2",
+        },
+        ("list_accounts", None, "accounts-2"): {"accountList": accounts[2:]},
+    }
+    for a in accounts:
+        pages[("list_account_roles", a["accountId"], None)] = {
+            "roleList": [{"roleName": f"Role {a['accountName']}"}]
+        }
+    # The first account answers last, so results complete out of order
+    boto_sso_client = FakeSSOClient(pages, delays={"000000000000": 0.1})
+
+    assert aws_sso_client.list_accounts(
+        boto_sso_client=boto_sso_client, max_workers=4
+    ) == [{**a, "roles": [f"Role {a['accountName']}"]} for a in accounts]
+    assert len(boto_sso_client.calls) == len(pages)
+
+
+def test_aws_sso_client_list_accounts_role_pages(aws_sso_client):
+    account = {"accountId": "123456789012", "accountName": "Test Account"}
+    boto_sso_client = FakeSSOClient(
+        {
+            ("list_accounts", None, None): {"accountList": [account]},
+            ("list_account_roles", "123456789012", None): {
+                "roleList": [{"roleName": "Test SSO"}],
+                "nextToken": "roles-2",
+            },
+            ("list_account_roles", "123456789012", "roles-2"): {
+                "roleList": [{"roleName": "Test SAML"}],
+            },
+        }
+    )
+
+    assert aws_sso_client.list_accounts(boto_sso_client=boto_sso_client) == [
+        {**account, "roles": ["Test SSO", "Test SAML"]}
+    ]
+
+
 @pytest.mark.parametrize(
     "aws_role_credentials",
     ["aws_sso_role_credentials", "aws_saml_role_credentials"],
@@ -144,12 +231,29 @@ def test_aws_data(random_string, aws_role_credentials):
 
     new_name = f"{random_string}/renamed"
     ad.mv_credentials(random_string, new_name)
+    assert ad.list_credentials == {new_name: aws_role_credentials}
 
     ad.rm_credentials(new_name)
     with pytest.raises(KeyError):
         ad.credentials(new_name)
 
 
+def test_aws_data_credentials_cache(random_string, aws_saml_role_credentials):
+    ad = authum.plugins.aws.lib.AWSData()
+
+    ad.set_credentials(random_string, aws_saml_role_credentials)
+    assert ad.credentials(random_string) is not ad.credentials(random_string)
+
+    aws_saml_role_credentials.expiration_timestamp = time.time() + 3600
+    ad.set_credentials(random_string, aws_saml_role_credentials)
+    credentials = ad.credentials(random_string)
+    assert ad.credentials(random_string) is credentials
+
+    ad.rm_credentials(random_string)
+    with pytest.raises(KeyError):
+        ad.credentials(random_string)
+
+
 def test_aws_sso_role_credentials_renew(
     response_data, aws_sso_role_credentials, aws_sso_client
 ):
@@ -188,11 +292,17 @@ def test_aws_sso_role_credentials_renew(
 def test_aws_role_credentials_env_vars_export(aws_role_credentials):
     assert (
         aws_role_credentials.env_vars_export
-        == "export AWS_ACCESS_KEY_ID='EXAMPLEACCESSKEY'\nexport"
-        " AWS_SECRET_ACCESS_KEY='EXAMPLEACCESSKEY'\nexport"
-        " AWS_SESSION_TOKEN='EXAMPLESESSIONTOKEN'"
+        == "export AWS_ACCESS_KEY_ID=EXAMPLEACCESSKEY\nexport"
+        " AWS_SECRET_ACCESS_KEY=EXAMPLEACCESSKEY\nexport"
+        " AWS_SESSION_TOKEN=EXAMPLESESSIONTOKEN"
     )
 
+    aws_role_credentials.session_token = "EXAMPLE'TOKEN"
+    assert shlex.split(aws_role_credentials.env_vars_export.splitlines()[-1]) == [
+        "export",
+        "AWS_SESSION_TOKEN=EXAMPLE'TOKEN",
+    ]
+
 
 @pytest.mark.parametrize(
     "aws_role_credentials",
@@ -203,6 +313,40 @@ def test_aws_role_credentials_ttl_str(aws_role_credentials):
     assert re.match(r"^-\d+ days", aws_role_credentials.ttl_str)
 
 
+@pytest.mark.parametrize(
+    "aws_role_credentials",
+    ["aws_sso_role_credentials", "aws_saml_role_credentials"],
+    indirect=True,
+)
+def test_aws_role_credentials_is_expired(aws_role_credentials):
+    assert aws_role_credentials.is_expired
+
+    aws_role_credentials.expiration_timestamp = time.time() + 120
+    assert aws_role_credentials.is_expired
+    assert not aws_role_credentials.ttl_str.startswith("-")
+
+    aws_role_credentials.expiration_timestamp = time.time() + 3600
+    assert not aws_role_credentials.is_expired
+
+
+def test_cacheable_aws_object_save_to_cache(monkeypatch, aws_saml_role_credentials):
+    saves = []
+    monkeypatch.setattr(
+        aws_saml_role_credentials.cache, "save", lambda: saves.append(True)
+    )
+
+    cache = {}
+    aws_saml_role_credentials.save_to_cache(cache, "example")
+    aws_saml_role_credentials.save_to_cache(cache, "example")
+    assert cache["example"] == aws_saml_role_credentials.asdict()
+    assert len(saves) == 1
+
+    aws_saml_role_credentials.session_token = "NEWSESSIONTOKEN"
+    aws_saml_role_credentials.save_to_cache(cache, "example")
+    assert cache["example"]["session_token"] == "NEWSESSIONTOKEN"
+    assert len(saves) == 2
+
+
 @pytest.mark.parametrize(
     "aws_role_credentials",
     ["aws_sso_role_credentials", "aws_saml_role_credentials"],
@@ -215,6 +359,19 @@ def test_aws_role_credentials_exec(aws_role_credentials):
     assert cp.stdout == "EXAMPLEACCESSKEY\n"
 
 
+def test_aws_role_credentials_execvpe():
+    script = (
+        "import keyring, keyring.backends.null;"
+        "keyring.set_keyring(keyring.backends.null.Keyring());"
+        "import authum.plugins.aws.lib as lib;"
+        "lib.AWSSAMLRoleCredentials("
+        "name='test', saml_url='https://example.com', secret_access_key='EXAMPLE'"
+        ").execvpe(('bash', '-c', 'echo $AWS_SECRET_ACCESS_KEY'))"
+    )
+    cp = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True)
+    assert cp.stdout == "EXAMPLE\n"
+
+
 @pytest.mark.parametrize(
     "aws_role_credentials",
     ["aws_sso_role_credentials", "aws_saml_role_credentials"],
@@ -226,11 +383,6 @@ def test_aws_role_credentials_assume_role(response_data, aws_role_credentials):
     )
     stubber = botocore.stub.Stubber(boto_sts_client)
 
-    stubber.add_response(
-        "get_caller_identity",
-        json.loads(response_data("aws/sts/get_caller_identity.json")),
-    )
-
     assume_role_response = json.loads(response_data("aws/sts/assume_role.json"))
     assume_role_response["Credentials"]["Expiration"] = botocore.utils.parse_timestamp(
         assume_role_response["Credentials"]["Expiration"]
@@ -240,7 +392,7 @@ def test_aws_role_credentials_assume_role(response_data, aws_role_credentials):
         assume_role_response,
         {
             "RoleArn": "arn:aws:sts::123456789012:assumed-role/TestRole",
-            "RoleSessionName": "test@example.com",
+            "RoleSessionName": aws_role_credentials.name,
             "ExternalId": "example",
         },
     )
@@ -272,3 +424,69 @@ def test_normalize_start_url(str, result):
         )
         == result
     )
+
+
+def test_boto_client():
+    client = authum.plugins.aws.lib.boto_client("sts", endpoint_url="http://sts")
+    assert (
+        authum.plugins.aws.lib.boto_client("sts", endpoint_url="http://sts") is client
+    )
+    assert authum.plugins.aws.lib.boto_client("sts") is not client
+    assert client.meta.config.retries["mode"] == "adaptive"
+
+
+@pytest.mark.parametrize(
+    "name, result",
+    [
+        ["example", "example"],
+        ["team/role name", "team-role-name"],
+        ["x" * 100, "x" * 64],
+    ],
+)
+def test_aws_role_credentials_role_session_name(aws_sso_role_credentials, name, result):
+    aws_sso_role_credentials.name = name
+    assert aws_sso_role_credentials.role_session_name == result
+
+
+def test_aws_role_credentials_role_session_name_short(aws_sso_role_credentials):
+    aws_sso_role_credentials.name = "/"
+    assert re.fullmatch(
+        r"authum-[0-9a-f]{16}", aws_sso_role_credentials.role_session_name
+    )
+
+
+def test_aws_role_credentials_assume_role_negative_cache(aws_sso_role_credentials):
+    boto_sts_client = boto3.client(
+        "sts", aws_access_key_id="test", aws_secret_access_key="test"
+    )
+    stubber = botocore.stub.Stubber(boto_sts_client)
+    stubber.add_client_error("assume_role", service_error_code="AccessDenied")
+    stubber.activate()
+
+    aws_sso_role_credentials.assume_role_arn = (
+        "arn:aws:sts::123456789012:assumed-role/DeniedRole"
+    )
+    with pytest.raises(botocore.exceptions.ClientError):
+        aws_sso_role_credentials.assume_role(boto_sts_client=boto_sts_client)
+    for _ in range(2):
+        with pytest.raises(authum.plugins.aws.lib.AWSPluginError, match="AccessDenied"):
+            aws_sso_role_credentials.assume_role(boto_sts_client=boto_sts_client)
+    stubber.assert_no_pending_responses()
+
+
+def test_aws_role_credentials_assume_role_negative_cache_caller_error(
+    aws_sso_role_credentials, negative_cache
+):
+    boto_sts_client = boto3.client(
+        "sts", aws_access_key_id="test", aws_secret_access_key="test"
+    )
+    stubber = botocore.stub.Stubber(boto_sts_client)
+    stubber.add_client_error("assume_role", service_error_code="InvalidClientTokenId")
+    stubber.activate()
+
+    aws_sso_role_credentials.assume_role_arn = (
+        "arn:aws:sts::123456789012:assumed-role/TestRole"
+    )
+    with pytest.raises(botocore.exceptions.ClientError):
+        aws_sso_role_credentials.assume_role(boto_sts_client=boto_sts_client)
+    assert negative_cache == {}
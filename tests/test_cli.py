@@ -0,0 +1,52 @@
+import click.testing
+import pluggy
+import pytest
+
+import authum
+import authum.cli
+import authum.plugin
+
+
+@pytest.fixture()
+def cli(monkeypatch, tmp_path):
+    manager = pluggy.PluginManager(authum.plugin.__package__)
+    manager.add_hookspecs(authum.plugin)
+    monkeypatch.setattr(authum.plugin, "manager", manager)
+    monkeypatch.setattr(
+        authum.plugin, "PLUGIN_CACHE_PATH", str(tmp_path / "plugins.json")
+    )
+    monkeypatch.setattr(authum.cli, "plugins", authum.cli.Plugins())
+    monkeypatch.setattr(authum.cli.main, "commands", dict(authum.cli.main.commands))
+    monkeypatch.setattr(authum.cli.main, "_cli_extended", False)
+    return authum.cli.main
+
+
+def test_cli_version(cli):
+    result = click.testing.CliRunner().invoke(cli, ["--version"])
+    assert result.exit_code == 0
+    assert result.output.startswith(
+        f"{authum.metadata['Name']} {authum.metadata['Version']}\n"
+    )
+    assert "- aws (authum.plugins.aws)" in result.output
+    assert "- okta (authum.plugins.okta)" in result.output
+
+
+def test_cli_help(cli):
+    result = click.testing.CliRunner().invoke(cli, ["--help"])
+    assert result.exit_code == 0
+    for command in ("apps", "aws", "jumpcloud", "okta"):
+        assert f"  {command} " in result.output
+
+
+def test_cli_plugin_command(cli):
+    assert "aws" not in cli.commands
+    result = click.testing.CliRunner().invoke(cli, ["aws", "ls"])
+    assert result.exit_code == 0
+    assert "aws" in cli.commands
+
+
+def test_cli_apps(cli):
+    result = click.testing.CliRunner().invoke(cli, ["apps"])
+    assert result.exit_code == 0
+    assert authum.cli.plugins.modules
+    assert "aws" not in cli.commands
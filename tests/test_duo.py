@@ -1,3 +1,6 @@
+import socket
+import urllib.parse
+
 import authum.duo
 import authum.http
 
@@ -17,3 +20,22 @@ def test_duo_start_server(random_url, random_string):
     duo.start_server()
     response = http.http_request(url=duo.server_url)
     assert f"<title>{name}" in response.text
+
+
+def test_duo_start_server_idle_connection(random_url, random_string):
+    http = authum.http.HTTPClient()
+    duo = authum.duo.DuoWebV2(
+        name="Test",
+        http_client=http,
+        host=random_url,
+        sig_request=random_string,
+        post_action=f"{random_url}/test",
+    )
+    duo.start_server()
+
+    # Browsers open connections ahead of time; an idle one must not block
+    # other requests
+    url = urllib.parse.urlparse(duo.server_url)
+    with socket.create_connection((url.hostname, url.port)):
+        response = http.http_request(url=duo.server_url, timeout=5)
+    assert response.ok
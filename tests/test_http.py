@@ -9,6 +9,11 @@ def a(response_data):
     return authum.http.SAMLAssertion(response_data("saml/response.xml"))
 
 
+def test_saml_assertion_b64encoded(a):
+    assert authum.http.SAMLAssertion(a.b64encoded) == a
+    assert authum.http.SAMLAssertion(a.b64encoded).xml == a.xml
+
+
 def test_saml_assertion_attrs_getitem_error(a):
     with pytest.raises(KeyError):
         a.attrs["invalid"]
@@ -28,6 +33,18 @@ def test_saml_assertion_attrs_iter(a):
     }
 
 
+def test_saml_assertion_attrs_duplicate_name():
+    attrs = authum.http.SAMLAssertionAttributes(
+        """<saml:Assertion xmlns:saml="urn:oasis:names:tc:SAML:2.0:assertion">
+        <saml:AttributeStatement>
+        <saml:Attribute Name="A"><saml:AttributeValue>1</saml:AttributeValue></saml:Attribute>
+        <saml:Attribute Name="A"><saml:AttributeValue>2</saml:AttributeValue></saml:Attribute>
+        </saml:AttributeStatement>
+        </saml:Assertion>"""
+    )
+    assert attrs["A"] == ["1"]
+
+
 def test_saml_assertion_attrs_len(a):
     assert len(a.attrs) == 3
 
@@ -50,3 +67,62 @@ def test_saml_request_ok(response_data):
 
     response = authum.http.HTTPClient().saml_request(url=url)
     assert response == saml_assertion
+
+
+@pytest.mark.parametrize(
+    "content, result",
+    [
+        [b'<input name="SAMLResponse" value="abc&#x3d;">', "abc="],
+        [b"<INPUT type='hidden' value='abc' name='SAMLResponse'/>", "abc"],
+        [b'<input name=SAMLResponse value="abc">', "abc"],
+        [b'<input name="RelayState" value="abc">', None],
+        [b'<input data-value="x" name="SAMLResponse" value="abc">', "abc"],
+        [
+            b'<input data-name="SAMLResponse" value="x">'
+            b'<input name="SAMLResponse" value="abc">',
+            "abc",
+        ],
+    ],
+)
+def test_find_saml_response(content, result):
+    assert authum.http.find_saml_response(content) == result
+
+
+@pytest.mark.parametrize(
+    "body, content_type, result",
+    [
+        ['{"foo": "bar"}', "application/json", {"foo": "bar"}],
+        ['{"foo": "bar"}', "text/plain", {"foo": "bar"}],
+        ['{"foo": "bar"}', "text/html", {}],
+        ["<html></html>", "text/plain", {}],
+        ["", "application/json", {}],
+    ],
+)
+@responses.activate
+def test_rest_request(body, content_type, result):
+    url = "https://example.com/"
+    responses.add(method=responses.GET, url=url, body=body, content_type=content_type)
+
+    response = authum.http.HTTPClient().rest_request(url=url, method="get")
+    assert dict(response) == result
+
+
+@responses.activate
+def test_rest_request_json():
+    url = "https://example.com/"
+    responses.add(method=responses.POST, url=url, json={})
+
+    authum.http.HTTPClient().rest_request(
+        url=url, method="post", json={"username": "test", "password": "test"}
+    )
+    request = responses.calls[0].request
+    assert request.body == b'{"username":"test","password":"test"}'
+    assert request.headers["Content-Type"] == "application/json"
+
+
+def test_sso_application_sort():
+    apps = [
+        authum.http.SSOApplication(name="b", url="https://b"),
+        authum.http.SSOApplication(name="A", url="https://a"),
+    ]
+    assert [a.name for a in sorted(apps)] == ["A", "b"]
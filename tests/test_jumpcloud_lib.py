@@ -1,8 +1,10 @@
 import os
+import time
 
 import pytest
 import responses
 
+import authum.plugins.jumpcloud
 import authum.plugins.jumpcloud.lib
 import authum.http
 
@@ -24,6 +26,30 @@ def jumpcloud_client(jumpcloud_email, jumpcloud_password):
     )
 
 
+@pytest.fixture
+def jumpcloud_data(jumpcloud_email, jumpcloud_password):
+    """Configures the shared JumpCloud data with a recently verified session"""
+    jumpcloud_data = authum.plugins.jumpcloud.lib.jumpcloud_data()
+    with jumpcloud_data.batch():
+        jumpcloud_data.email = jumpcloud_email
+        jumpcloud_data.password = jumpcloud_password
+        jumpcloud_data.session = authum.plugins.jumpcloud.lib.JumpCloudClientSession(
+            cookie="initial_cookie", xsrf="initial_xsrf", verified_at=time.time()
+        )
+    yield jumpcloud_data
+    jumpcloud_data.delete()
+
+
+def test_jumpcloud_client_session(jumpcloud_email, jumpcloud_password):
+    clients = [
+        authum.plugins.jumpcloud.lib.JumpCloudClient(
+            email=jumpcloud_email, password=jumpcloud_password
+        )
+        for _ in range(2)
+    ]
+    assert clients[0].session is not clients[1].session
+
+
 @responses.activate
 def test_jumpcloud_auth_invalid_credentials(random_string, response_data):
     jumpcloud_client = authum.plugins.jumpcloud.lib.JumpCloudClient(
@@ -100,12 +126,106 @@ def test_jumpcloud_applications(jumpcloud_client, response_data):
     assert labels == ["GitHub", "Google Mail"]
 
 
-def test_jumpcloud_data():
+@responses.activate
+def test_jumpcloud_sso_urls(jumpcloud_client, response_data):
+    responses.add(
+        method=responses.GET,
+        url=jumpcloud_client.urls["applications"],
+        body=response_data("jumpcloud/applications.json"),
+    )
+
+    assert jumpcloud_client.sso_urls == jumpcloud_client.sso_urls
+    assert len(jumpcloud_client.sso_urls) == 2
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+def test_jumpcloud_applications_session_rejected(jumpcloud_client):
+    responses.add(
+        method=responses.GET,
+        url=jumpcloud_client.urls["applications"],
+        status=302,
+        headers={"Location": "/login"},
+    )
+
+    with pytest.raises(authum.plugins.jumpcloud.lib.JumpCloudSessionError):
+        jumpcloud_client.sso_urls
+
+
+@pytest.mark.parametrize(
+    "attr, value",
+    [
+        ["email", "foo"],
+        ["password", "bar"],
+        ["session", authum.plugins.jumpcloud.lib.JumpCloudClientSession()],
+    ],
+)
+def test_jumpcloud_data(attr, value):
     od = authum.plugins.jumpcloud.lib.JumpCloudData()
-    od.email = "foo"
-    od.password = "bar"
-    od.session = authum.plugins.jumpcloud.lib.JumpCloudClientSession()
+    setattr(od, attr, value)
+    assert getattr(od, attr) == value
+
+
+def test_jumpcloud_data_shared():
+    assert (
+        authum.plugins.jumpcloud.lib.jumpcloud_data()
+        is authum.plugins.jumpcloud.lib.jumpcloud_data()
+    )
+
+
+def test_jumpcloud_data_session_reset():
+    jd = authum.plugins.jumpcloud.lib.JumpCloudData()
+    jd.email = "foo"
+    jd.session = authum.plugins.jumpcloud.lib.JumpCloudClientSession(
+        cookie="foo", verified_at=1
+    )
+
+    jd.email = "foo"
+    assert jd.session.cookie == "foo"
+
+    jd.email = "bar"
+    assert jd.session == authum.plugins.jumpcloud.lib.JumpCloudClientSession()
+
+
+@responses.activate
+def test_get_jumpcloud_client_recently_verified(jumpcloud_data):
+    client = authum.plugins.jumpcloud.get_jumpcloud_client()
+    assert client.session.cookie == "initial_cookie"
+    assert len(responses.calls) == 0
+
+
+@responses.activate
+def test_jumpcloud_list_apps_session_retry(jumpcloud_data, response_data):
+    client = authum.plugins.jumpcloud.get_jumpcloud_client()
+    responses.add(
+        method=responses.GET,
+        url=client.urls["applications"],
+        status=302,
+        headers={"Location": "/login"},
+    )
+    responses.add(
+        method=responses.GET,
+        url=client.urls["self"],
+        body=response_data("jumpcloud/self.json"),
+    )
+    responses.add(
+        method=responses.GET,
+        url=client.urls["applications"],
+        body=response_data("jumpcloud/applications.json"),
+    )
+
+    apps = authum.plugins.jumpcloud.list_apps()
+    assert [a.name for a in apps] == ["GitHub", "Google Mail"]
+    assert [c.request.url for c in responses.calls] == [
+        client.urls["applications"],
+        client.urls["self"],
+        client.urls["applications"],
+    ]
+
+
+def test_jumpcloud_client_session_recently_verified():
+    session = authum.plugins.jumpcloud.lib.JumpCloudClientSession()
+    assert not session.recently_verified
 
-    assert od.email == "foo"
-    assert od.password == "bar"
-    assert od.session == authum.plugins.jumpcloud.lib.JumpCloudClientSession()
+    session.verified_at = time.time()
+    assert session.recently_verified
@@ -1,12 +1,19 @@
+import json
 import os
+import time
+from typing import Mapping
 
 import pytest
 import responses
 
+import authum.plugins.okta
 import authum.plugins.okta.lib
 import authum.http
 
 
+OKTA_REFRESH_URL = "http://{}/api/v1/sessions/initial_session_id/lifecycle/refresh"
+
+
 @pytest.fixture
 def okta_domain(random_string):
     return os.environ.get("AUTHUM_OKTA_DOMAIN", f"{random_string}.okta.com")
@@ -22,6 +29,14 @@ def okta_password(random_string):
     return os.environ.get("AUTHUM_OKTA_PASSWORD", random_string)
 
 
+def factor_index(response: Mapping) -> dict:
+    """Maps each factor type to the first matching (factor id, verify URL)"""
+    index = {}
+    for f in response["_embedded"]["factors"]:
+        index.setdefault(f["factorType"], (f["id"], f["_links"]["verify"]["href"]))
+    return index
+
+
 @pytest.fixture
 def okta_client(okta_domain, okta_username, okta_password):
     return authum.plugins.okta.lib.OktaClient(
@@ -30,12 +45,54 @@ def okta_client(okta_domain, okta_username, okta_password):
         password=okta_password,
         session=authum.plugins.okta.lib.OktaClientSession(
             id="initial_session_id",
-            refresh_url=f"http://{okta_domain}/api/v1/sessions/initial_session_id/lifecycle/refresh",
+            refresh_url=OKTA_REFRESH_URL.format(okta_domain),
         ),
         poll_interval=0,
     )
 
 
+@pytest.fixture
+def okta_mfa_responses(okta_client, response_data, okta_domain):
+    """Registers responses for a lazy authn that requires MFA"""
+
+    def _okta_mfa_responses():
+        responses.add(
+            method=responses.POST,
+            url=okta_client.session.refresh_url,
+            status=404,
+            body=response_data("okta/session_expired.json", yourOktaDomain=okta_domain),
+        )
+        responses.add(
+            method=responses.POST,
+            url=okta_client.urls["authn"],
+            body=response_data("okta/mfa_required.json", yourOktaDomain=okta_domain),
+        )
+        responses.add(
+            method=responses.POST,
+            url=okta_client.urls["sessions"],
+            body=response_data("okta/session_create.json", yourOktaDomain=okta_domain),
+        )
+
+    return _okta_mfa_responses
+
+
+@pytest.fixture
+def okta_data(okta_domain, okta_username, okta_password):
+    """Configures the shared Okta data with a recently verified session"""
+    okta_data = authum.plugins.okta.lib.okta_data()
+    with okta_data.batch():
+        okta_data.domain = okta_domain
+        okta_data.username = okta_username
+        okta_data.password = okta_password
+        okta_data.session = authum.plugins.okta.lib.OktaClientSession(
+            id="initial_session_id",
+            refresh_url=OKTA_REFRESH_URL.format(okta_domain),
+            verified_at=time.time(),
+        )
+    yield okta_data
+    okta_data.delete()
+
+
 @responses.activate
 def test_okta_authn_org_not_found(random_string, okta_username, okta_password):
     okta_client = authum.plugins.okta.lib.OktaClient(
@@ -68,45 +125,31 @@ def test_okta_authn_invalid_credentials(okta_domain, random_string, response_dat
 @pytest.mark.parametrize(
     "factor_type, factor_args, wait_count",
     [
-        ["token", {"passCode": "123456"}, 0],
-        ["token:software:totp", {"passCode": "123456"}, 0],
-        ["sms", {"passCode": "123456"}, 0],
-        ["call", {"passCode": "123456"}, 0],
-        ["push", {}, 2],
+        pytest.param("token", {"passCode": "123456"}, 0, id="token"),
+        pytest.param("token:software:totp", {"passCode": "123456"}, 0, id="totp"),
+        pytest.param("sms", {"passCode": "123456"}, 0, id="sms"),
+        pytest.param("call", {"passCode": "123456"}, 0, id="call"),
+        pytest.param("push", {}, 2, id="push"),
     ],
 )
 @responses.activate
 def test_okta_authn_lazy_mfa(
-    okta_client, response_data, okta_domain, factor_type, factor_args, wait_count
+    okta_client,
+    okta_mfa_responses,
+    response_data,
+    okta_domain,
+    factor_type,
+    factor_args,
+    wait_count,
 ):
-    responses.add(
-        method=responses.POST,
-        url=okta_client.session.refresh_url,
-        status=404,
-        body=response_data("okta/session_expired.json", yourOktaDomain=okta_domain),
-    )
-    responses.add(
-        method=responses.POST,
-        url=okta_client.urls["authn"],
-        body=response_data("okta/mfa_required.json", yourOktaDomain=okta_domain),
-    )
-    responses.add(
-        method=responses.POST,
-        url=okta_client.urls["sessions"],
-        body=response_data("okta/session_create.json", yourOktaDomain=okta_domain),
-    )
+    okta_mfa_responses()
 
     try:
         okta_client.authn(lazy=True)
         assert False
 
     except authum.plugins.okta.lib.OktaMFARequired as e:
-        factor_id = authum.plugins.okta.lib.factor_ids_by_type(e.response, factor_type)[
-            0
-        ]
-        url = authum.plugins.okta.lib.factor_by_id(e.response, factor_id)["_links"][
-            "verify"
-        ]["href"]
+        factor_id, url = factor_index(e.response)[factor_type]
 
         for _ in range(wait_count):
             responses.add(
@@ -126,6 +169,36 @@ def test_okta_authn_lazy_mfa(
         assert okta_client.session.id == "101W_juydrDRByB7fUdRyE2JQ"
 
 
+@responses.activate
+def test_okta_verify_backoff(
+    monkeypatch, okta_client, okta_mfa_responses, response_data, okta_domain
+):
+    sleeps = []
+    monkeypatch.setattr(authum.plugins.okta.lib.time, "sleep", sleeps.append)
+    okta_client._poll_interval = 1.0
+    okta_client._poll_min_interval = 0.25
+
+    okta_mfa_responses()
+
+    with pytest.raises(authum.plugins.okta.lib.OktaMFARequired) as e:
+        okta_client.authn(lazy=True)
+
+    mfa_response = e.value.response
+    factor_id, url = factor_index(mfa_response)["push"]
+    for _ in range(4):
+        responses.add(
+            method=responses.POST,
+            url=url,
+            body=response_data("okta/mfa_challenge.json", yourOktaDomain=okta_domain),
+        )
+    responses.add(
+        method=responses.POST, url=url, body=response_data("okta/authn_success.json")
+    )
+
+    okta_client.verify(mfa_response, factor_id)
+    assert sleeps == [0.25, 0.5, 1.0, 1.0]
+
+
 @responses.activate
 def test_okta_authn_lazy_refresh(okta_client, response_data, okta_domain):
     responses.add(
@@ -155,14 +228,108 @@ def test_okta_app_links(okta_client, response_data, okta_domain):
     ]
 
 
-def test_okta_data():
+@responses.activate
+def test_okta_app_links_session_rejected(okta_client, response_data, okta_domain):
+    responses.add(
+        method=responses.GET,
+        url=okta_client.urls["app_links"],
+        status=403,
+        body=response_data("okta/authn_failed.json"),
+    )
+
+    with pytest.raises(authum.plugins.okta.lib.OktaSessionError):
+        okta_client.app_links()
+
+
+@pytest.mark.parametrize(
+    "attr, value",
+    [
+        ["domain", "foo"],
+        ["username", "bar"],
+        ["password", "baz"],
+        ["session", authum.plugins.okta.lib.OktaClientSession()],
+    ],
+)
+def test_okta_data(attr, value):
+    od = authum.plugins.okta.lib.OktaData()
+    setattr(od, attr, value)
+    assert getattr(od, attr) == value
+
+
+def test_okta_data_shared():
+    assert authum.plugins.okta.lib.okta_data() is authum.plugins.okta.lib.okta_data()
+
+
+@pytest.mark.parametrize("attr", ["domain", "username"])
+def test_okta_data_session_reset(attr):
     od = authum.plugins.okta.lib.OktaData()
-    od.domain = "foo"
-    od.username = "bar"
-    od.password = "baz"
-    od.session = authum.plugins.okta.lib.OktaClientSession()
-
-    assert od.domain == "foo"
-    assert od.username == "bar"
-    assert od.password == "baz"
+    setattr(od, attr, "foo")
+    od.session = authum.plugins.okta.lib.OktaClientSession(id="foo", verified_at=1)
+
+    setattr(od, attr, "foo")
+    assert od.session.id == "foo"
+
+    setattr(od, attr, "bar")
     assert od.session == authum.plugins.okta.lib.OktaClientSession()
+
+
+@responses.activate
+def test_get_okta_client_recently_verified(okta_data):
+    client = authum.plugins.okta.get_okta_client()
+    assert client.session.id == "initial_session_id"
+    assert len(responses.calls) == 0
+
+
+@responses.activate
+def test_okta_list_apps_session_retry(okta_data, response_data, okta_domain):
+    client = authum.plugins.okta.get_okta_client()
+    responses.add(
+        method=responses.GET,
+        url=client.urls["app_links"],
+        status=403,
+        body=response_data("okta/authn_failed.json"),
+    )
+    responses.add(
+        method=responses.POST,
+        url=client.session.refresh_url,
+        body=response_data("okta/session_refresh.json", yourOktaDomain=okta_domain),
+    )
+    responses.add(
+        method=responses.GET,
+        url=client.urls["app_links"],
+        body=response_data("okta/app_links.json", yourOktaDomain=okta_domain),
+    )
+
+    apps = authum.plugins.okta.list_apps()
+    assert [a.name for a in apps] == [
+        "Google Apps Mail",
+        "Google Apps Calendar",
+        "Box",
+        "Salesforce.com",
+    ]
+    assert [c.request.url for c in responses.calls] == [
+        client.urls["app_links"],
+        client.session.refresh_url,
+        client.urls["app_links"],
+    ]
+
+
+def test_okta_client_session_recently_verified():
+    session = authum.plugins.okta.lib.OktaClientSession()
+    assert not session.recently_verified
+
+    session.verified_at = time.time()
+    assert session.recently_verified
+
+
+def test_okta_factor_lookup(response_data, okta_domain):
+    response = json.loads(
+        response_data("okta/mfa_required.json", yourOktaDomain=okta_domain)
+    )
+
+    for factor_type, (factor_id, url) in factor_index(response).items():
+        assert authum.plugins.okta.lib.factor_ids_by_type(response, factor_type) == [
+            factor_id
+        ]
+        factor = authum.plugins.okta.lib.factor_by_id(response, factor_id)
+        assert factor["_links"]["verify"]["href"] == url
@@ -1,3 +1,4 @@
+import keyring
 import pytest
 
 import authum.persistence
@@ -48,3 +49,23 @@ def test_keyring_item_delete(k):
 
     new_k = authum.persistence.KeyringItem(k.keyring_item_name)
     assert new_k.asdict() == {}
+
+
+def test_keyring_item_load_external_write(k):
+    k.save()
+    keyring.set_password("authum", k.keyring_item_name, '{"foo":"external"}')
+    new_k = authum.persistence.KeyringItem(k.keyring_item_name)
+    assert new_k.asdict() == {"foo": "external"}
+
+
+def test_keyring_item_batch(k, monkeypatch):
+    writes = []
+    monkeypatch.setattr(keyring, "set_password", lambda *args: writes.append(args))
+    with k.batch():
+        k["foo"] = "foo"
+        k.save()
+        with k.batch():
+            k["baz"] = "baz"
+            k.save()
+        assert writes == []
+    assert len(writes) == 1
@@ -1,9 +1,31 @@
+import pkgutil
+import sys
+
 import authum.plugin
 
 
-def test_load_plugins():
+def test_load_plugins(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        authum.plugin, "PLUGIN_CACHE_PATH", str(tmp_path / "plugins.json")
+    )
     assert authum.plugin.load_plugins() == [
         "authum.plugins.aws",
         "authum.plugins.jumpcloud",
         "authum.plugins.okta",
     ]
+
+
+def test_find_plugin_modules(monkeypatch, tmp_path):
+    cache_path = tmp_path / "plugins.json"
+    monkeypatch.setattr(authum.plugin, "PLUGIN_CACHE_PATH", str(cache_path))
+    monkeypatch.setattr(sys, "path", list(sys.path))
+
+    plugin_path = tmp_path / "plugins"
+    (plugin_path / "authum-test").mkdir(parents=True)
+    (plugin_path / "authum-test" / "__init__.py").touch()
+
+    assert authum.plugin.find_plugin_modules(str(plugin_path)) == ["authum-test"]
+    assert cache_path.exists()
+
+    monkeypatch.setattr(pkgutil, "iter_modules", lambda: [])
+    assert authum.plugin.find_plugin_modules() == ["authum-test"]
@@ -34,3 +34,9 @@ def test_is_url(url, result):
 )
 def test_url_has_domain(url, domain, result):
     assert authum.util.url_has_domain(url, domain) == result
+
+
+@pytest.mark.parametrize("row_count", [1, authum.util.rich_table_max_rows + 1])
+def test_print_rows(capsys, row_count):
+    authum.util.print_rows(("Name", "URL"), [("test", "http://test")] * row_count)
+    assert capsys.readouterr().err.count("http://test") == row_count